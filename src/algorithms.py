@@ -1,176 +1,450 @@
 import pygame
-from enum import Enum
-from typing import Optional, Any
+from array import array
+from typing import Iterator, Optional
 
-from cell import CellArray
-from config import colors, header
+from cell import CellArray, COMPARISONS, READS
+from config import (colors, header, font, timeline_keyframe_interval, timeline_max_bytes, timeline_snapshot_bytes_per_step,
+                    merge_bar_height)
+from graph import Graph
+from graph_view import GraphRenderer
+from heap import MinHeap
+from steps import CellState, Op, Step, StepEvent, binary_search_steps, dijkstra_steps, insertion_sort_steps, is_sorted, merge_sort_steps
+from timeline import Timeline
 from widgets import draw_text, InputBox, Button
-from utils import get_input_data
+from utils import cell_array_init, get_input_data, graph_init
+from workers import StepWorker, start_steps
 
 
-class BSState(Enum):
-    GET_GUESS = 1
-    COMPARE_GUESS = 2
+# Base class for algorithms driven by the step engine
+# The algorithm logic is a generator of steps (see steps.py), this class applies its events to a CellArray
+# Steps go through a Timeline so the algorithm can be stepped back or seeked to any recorded step
+class StepAlgorithm:
+    title = ""
 
-
-class BinarySearch:
-    def __init__(self, cell_array_obj: CellArray, val: int, x: int = 0, y: int = 0):
-        # cell_array_obj is the object instance of CellArray
-        # cell_array     is the physical array of all Cells
+    def __init__(self, cell_array_obj: CellArray, steps: Iterator[Step], x: int = 0, y: int = 0) -> None:
         self.cell_array_obj = cell_array_obj
-        self.cell_array = cell_array_obj.cell_array
-        self.val = val
         self.x = x
         self.y = y
 
-        # Starting and ending index of the CellArray
-        self.start, self.end = 0, len(self.cell_array) - 1
+        self.solved = False
+        self.last_step = ()
+        self.timeline = Timeline(steps, self.apply_step, self.snapshot, self.restore,
+                                 timeline_keyframe_interval, timeline_max_bytes, timeline_snapshot_bytes_per_step)
+
+    @property
+    def values(self):
+        # Looked up each time, the CellArray replaces its values when it copies shared values on write
+        return self.cell_array_obj.values
 
-        # Pointers to array search area
-        self.left, self.right = self.start, self.end
+    @property
+    def step_count(self) -> int:
+        return self.timeline.position
 
-        # Private state / variable iterators
-        self._state = BSState.GET_GUESS
-        self._solution_found = False
-        self._mid = None
-        self._guess = None
-
-    def get_guess(self) -> tuple[int, int]:
-        # Sets the current midpoint (as the guess) and value at the midpoint
-        self._mid = (self.left + self.right) // 2
-        self._guess = self.cell_array[self._mid]
-        
-        # The current guess is highlighted on the screen
-        self.cell_array_obj.set_selected(self._mid)
-
-    def compare_guess(self) -> Optional[int]:
-        guess_val = self._guess.value
-
-        # If guess is correct return index in the array
-        if guess_val == self.val:
-            self.cell_array[self._mid].set_custom_color(colors.SOLUTION)
-            self.cell_array_obj.set_inactive(self.start, self._mid - 1)
-            self.cell_array_obj.set_inactive(self._mid + 1, self.end)
-            self._solution_found = True
-        # If guess is smaller than value the value is in the larger half of the array
-        elif guess_val < self.val:
-            self.cell_array_obj.set_inactive(self.start, self._mid)
-            self.left = self._mid + 1 
-        # If guess is larger than value the value is in the smaller half of the array
+    def snapshot(self) -> tuple:
+        return self.cell_array_obj.snapshot(), self.solved
+
+    def restore(self, snapshot: tuple) -> None:
+        cell_snapshot, self.solved = snapshot
+        self.cell_array_obj.restore(cell_snapshot)
+
+    def get_counts(self) -> dict[str, int]:
+        """Returns the number of reads, writes, comparisons and swaps the algorithm did (see CellArray.counters)."""
+        return self.cell_array_obj.get_counts()
+
+    def apply_event(self, event: StepEvent) -> None:
+        if event.op == Op.SOLVED:
+            self.solved = True
         else:
-            self.cell_array_obj.set_inactive(self._mid, self.end)
-            self.right = self._mid - 1
-        
-        return None
-    
+            self.cell_array_obj.apply(event)
+
+    def apply_step(self, step: Step) -> None:
+        for event in step:
+            self.apply_event(event)
+        self.last_step = step
+
+    def is_step_ready(self) -> bool:
+        """Returns True if the next step can be taken without waiting for the algorithm's step worker (see workers.py)."""
+        timeline = self.timeline
+        if timeline.position < timeline.length or timeline.exhausted or not isinstance(timeline.steps, StepWorker):
+            return True
+        return timeline.steps.ready()
+
     def next_step(self) -> None:
-        if self._solution_found:
-            pass
-        else:
-            # For GET_GUESS state
-            #  Get the guess (midpoint of the CellArray) and mark it as "SELECTED"
-            #  Proceed the next call of this function to be the COMPARE_GUESS state
-            if (self._state == BSState.GET_GUESS):
-                self.get_guess()
-                self._state = BSState.COMPARE_GUESS
-            # For COMPARE_GUESS state
-            #  Make the previous "SELECTED" cell to be inactive (not the searched value)
-            #  Compare the current guess with the value to find and deactivate the according cells (as to compare_guess())
-            #  Proceed the next call of this function to be the GET_GUESS state
-            elif (self._state == BSState.COMPARE_GUESS):
-                self.compare_guess()
-                self._state = BSState.GET_GUESS
+        if not self.timeline.step_forward():
+            self.solved = True
+
+    def close(self) -> None:
+        # Stops the algorithm's step worker, or closes its generator
+        self.timeline.steps.close()
+
+    def previous_step(self) -> None:
+        self.timeline.step_back()
+
+    def seek(self, step: int) -> None:
+        self.timeline.seek(step)
 
     def draw(self, screen: pygame.Surface) -> None:
-        draw_text(screen, header, colors.SELECTED_COLOR, "Binary Search Algorithm", self.x, self.y - 100)
-        
+        draw_text(screen, header, colors.SELECTED_COLOR, self.title, self.x, self.y - 100)
         self.cell_array_obj.draw(self.x, self.y)
 
+    def draw_dirty(self, screen: pygame.Surface) -> list[pygame.Rect]:
+        return self.cell_array_obj.draw_dirty(self.x, self.y)
+
+
+class BinarySearch(StepAlgorithm):
+    title = "Binary Search Algorithm"
+
+    def __init__(self, cell_array_obj: CellArray, val: int, x: int = 0, y: int = 0, check_sorted: bool = True):
+        """
+        Raises:
+            ValueError: If check_sorted is set and the values are not sorted, as the search would give wrong answers.
+        """
+        if check_sorted and not is_sorted(cell_array_obj.values):
+            raise ValueError("Binary search needs the array to be sorted")
+
+        # The search only reads the values so it can use the CellArray's values directly
+        super().__init__(cell_array_obj, start_steps(binary_search_steps, cell_array_obj.values, val), x, y)
+        self.val = val
+
+        self._solution_found = False
+        self.solution_index = None
+
+    def snapshot(self) -> tuple:
+        return super().snapshot(), self._solution_found, self.solution_index
+
+    def restore(self, snapshot: tuple) -> None:
+        base_snapshot, self._solution_found, self.solution_index = snapshot
+        super().restore(base_snapshot)
+
+    def apply_event(self, event: StepEvent) -> None:
+        if event.op == Op.FOUND:
+            self._solution_found = True
+            self.solution_index = event.a
+        super().apply_event(event)
+
 
 class BinarySearchUI:
     def __init__(self, screen: pygame.Surface):
         self.input_boxes = [
-            InputBox(screen, "Array to search (seperated by commas)", 50, 140, 500, 50, 30),
-            InputBox(screen, "Value to find", 50, 240, 500, 50)
+            InputBox(screen, "Array to search (seperated by commas, @file or sorted:n)", 50, 140, 500, 50, 200),
+            InputBox(screen, "Value to find (or many to search as a batch, e.g. 1,5,9 or random:n)", 50, 240, 500, 50, 200)
         ]
         self.buttons = [
             Button(screen, "Submit", 50, 320, 125, 60, get_input_data(self.input_boxes))
         ]
 
 
-class InsertionSort:
+def _cell_array(screen: pygame.Surface, user_input: str) -> CellArray:
+    cell_array = cell_array_init(screen, user_input)
+    if cell_array is None:
+        raise ValueError(f"Invalid array {user_input}")
+    return cell_array
+
+
+class InsertionSort(StepAlgorithm):
+    title = "Insertion Sort Algorithm"
+
     def __init__(self, cell_array_obj: CellArray, x: int, y: int) -> None:
-        self.cell_array_obj = cell_array_obj
-        self.cell_array = cell_array_obj.cell_array
-        self.x = x
-        self.y = y
+        # The sort works on its own copy, the CellArray is only changed through the sort's swap events
+        super().__init__(cell_array_obj, start_steps(insertion_sort_steps, array("q", cell_array_obj.values)), x, y)
+
+
+class InsertionSortUI:
+    def __init__(self, screen: pygame.Surface) -> None:
+        self.input_boxes = [
+            InputBox(screen, "Array to sort (seperated by commas, @file or random:n)", 50, 140, 500, 50, 200),
+        ]
+        self.buttons = [
+            Button(screen, "Submit", 50, 220, 125, 60, get_input_data(self.input_boxes))
+        ]
+
+
+def create_insertion_sort(screen: pygame.Surface, user_input: str, x: int, y: int) -> InsertionSort:
+    """Creates an InsertionSort from the text typed into the InsertionSortUI.
+
+    Raises:
+        ValueError: If the array is invalid.
+    """
+    return InsertionSort(_cell_array(screen, user_input), x, y)
 
-        self.i = 1
-        self.cell_array_obj.set_solution(0)
-        self.j = self.i
-        self.swap_complete = False
-        self.solved = False
 
-    def mark_correct_spots(self) -> None:
-        self.cell_array_obj.set_solution(0, self.i)
-    
-    def swap(self) -> None:
-        if self.j > 0 and self.cell_array[self.j].value < self.cell_array[self.j - 1].value:
-            self.cell_array_obj.swap(self.j, self.j - 1)
-            self.j -= 1
+class MergeSort(StepAlgorithm):
+    title = "Merge Sort Algorithm"
+
+    # Vertical distance from the array to its auxiliary buffer
+    aux_offset = 230
+
+    def __init__(self, cell_array_obj: CellArray, x: int, y: int) -> None:
+        # Drawn copy of the sort's auxiliary buffer, it starts as a copy of the values so both bar charts share a scale
+        # and starts inactive as nothing has been copied into it yet
+        self.aux_array_obj = CellArray(cell_array_obj.screen, array("q", cell_array_obj.values))
+        self.aux_array_obj.set_inactive(0, len(cell_array_obj) - 1)
+        self.aux_array_obj.set_follow(False)
+
+        # Both arrays have to fit on screen
+        cell_array_obj.bars.height = merge_bar_height
+        self.aux_array_obj.bars.height = merge_bar_height
+
+        # The sort works on its own copy, the CellArrays are only changed through the sort's events
+        super().__init__(cell_array_obj, start_steps(merge_sort_steps, array("q", cell_array_obj.values)), x, y)
+
+    def snapshot(self) -> tuple:
+        return super().snapshot(), self.aux_array_obj.snapshot()
+
+    def restore(self, snapshot: tuple) -> None:
+        base_snapshot, aux_snapshot = snapshot
+        super().restore(base_snapshot)
+        self.aux_array_obj.restore(aux_snapshot)
+
+    def apply_event(self, event: StepEvent) -> None:
+        op, a, b, c = event
+        if op == Op.AUX_COPY:
+            self.aux_array_obj.copy_values(self.cell_array_obj, a, b + 1)
+            self.aux_array_obj.set_active(a, b)
+            self.cell_array_obj.set_inactive(a, b)
+            self.cell_array_obj.focus = a
+        elif op == Op.AUX_COMPARE:
+            self.aux_array_obj.compare(a, b)
+            self.aux_array_obj.focus = a
+        elif op == Op.AUX_TAKE:
+            self.cell_array_obj.set_value(a, self.aux_array_obj.get_value(b))
+            self.cell_array_obj.set_state(CellState(c), a)
+            self.aux_array_obj.set_inactive(b)
+            self.cell_array_obj.focus = a
         else:
-            self.swap_complete = True
-            self.mark_correct_spots()
+            super().apply_event(event)
 
-    def next_step(self) -> None:
-        if not self.solved:
-            if self.i < len(self.cell_array) - 1 or self.j > 0:
-                if self.swap_complete:
-                    if self.i + 1 < len(self.cell_array):
-                        self.i += 1
-                    self.j = self.i
-                    self.swap_complete = False
-                self.swap()
-            else:
-                self.mark_correct_spots()
-                self.solved = True
+    def get_counts(self) -> dict[str, int]:
+        # Operations on the auxiliary buffer count too
+        aux_counts = self.aux_array_obj.get_counts()
+        return {name: count + aux_counts[name] for name, count in super().get_counts().items()}
+
+    def _sync_aux_view(self) -> None:
+        # The buffer is shown with the same viewport as the array so each index lines up with its auxiliary slot
+        main, aux = self.cell_array_obj, self.aux_array_obj
+        aux.render_mode, aux.cell_size, aux.scroll = main.render_mode, main.cell_size, main.scroll
 
     def draw(self, screen: pygame.Surface) -> None:
-        draw_text(screen, header, colors.SELECTED_COLOR, "Insertion Sort Algorithm", self.x, self.y - 100)
-        self.cell_array_obj.draw(self.x, self.y)
+        super().draw(screen)
+        self._sync_aux_view()
+        draw_text(screen, font, colors.SELECTED_COLOR, "Auxiliary buffer", self.x, self.y + self.aux_offset - 80)
+        self.aux_array_obj.draw(self.x, self.y + self.aux_offset)
 
+    def draw_dirty(self, screen: pygame.Surface) -> list[pygame.Rect]:
+        rects = super().draw_dirty(screen)
+        self._sync_aux_view()
+        return rects + self.aux_array_obj.draw_dirty(self.x, self.y + self.aux_offset)
 
-class InsertionSortUI:
+
+class MergeSortUI:
     def __init__(self, screen: pygame.Surface) -> None:
         self.input_boxes = [
-            InputBox(screen, "Array to sort (seperated by commas)", 50, 140, 500, 50, 30),
+            InputBox(screen, "Array to sort (seperated by commas, @file or random:n)", 50, 140, 500, 50, 200),
         ]
         self.buttons = [
             Button(screen, "Submit", 50, 220, 125, 60, get_input_data(self.input_boxes))
         ]
 
 
-class Node:
-    def __init__(self, value) -> None:
-        self.value = value
-        self.left = None
-        self.right = None
-    
-    def __str__(self) -> str:
-        return f"{self.value}"
+def create_merge_sort(screen: pygame.Surface, user_input: str, x: int, y: int) -> MergeSort:
+    """Creates a MergeSort from the text typed into the MergeSortUI.
+
+    Raises:
+        ValueError: If the array is invalid.
+    """
+    return MergeSort(_cell_array(screen, user_input), x, y)
+
+
+# States of the nodes of a graph, as stored in Dijkstra.node_states
+UNSEEN, FRONTIER, SETTLED, PATH = range(4)
+NODE_COLORS = (colors.ACTIVE_COLOR, colors.SELECTED_COLOR, colors.PRIMARY_COLOR, colors.SOLUTION)
+
+
+class Dijkstra(StepAlgorithm):
+    title = "Dijkstra's Algorithm"
+
+    # Height of the graph and vertical distance from the graph to the heap
+    graph_height = 255
+    heap_offset = 300
+
+    def __init__(self, screen: pygame.Surface, graph: Graph, source: int, target: Optional[int], x: int, y: int) -> None:
+        """
+        Raises:
+            ValueError: If the source or the target is not a node of the graph, or a weight is negative.
+        """
+        # Checked here rather than when the steps first run, where the error would stop the render loop
+        n = graph.num_nodes
+        if not 0 <= source < n:
+            raise ValueError(f"Source {source} is not a node of the graph, which has {n} nodes")
+        if target is not None and not 0 <= target < n:
+            raise ValueError(f"Target {target} is not a node of the graph, which has {n} nodes")
+        if graph.weights and min(graph.weights) < 0:
+            raise ValueError("Dijkstra's algorithm needs weights that are not negative")
+
+        self.graph = graph
+        self.source = source
+        self.target = target
+        self.renderer = GraphRenderer(graph, pygame.Rect(x, y - 45, screen.get_width() - 2 * x, self.graph_height))
+
+        # Mirror of the algorithm's heap, rebuilt from its events, drawn as the keys in heap order with empty slots inactive
+        self.heap = MinHeap(n)
+        self.heap.on_write = self._heap_written
+        heap_array = CellArray(screen, array("q", [0]) * n)
+        heap_array.set_inactive(0, n - 1)
+        heap_array.bars.height = 60
+
+        # Distance and previous node of every reached node, and the state of every node
+        self.dist = array("q", [-1]) * n
+        self.pred = array("q", [-1]) * n
+        self.node_states = bytearray(n)
 
+        # Node being settled and the edge of it last examined
+        self.current_node = -1
+        self.current_edge = -1
 
-class MinHeap:
-    def __init__(self) -> None:
-        pass
+        # (u, v, color) edges and nodes changed since the last draw, the whole graph is redrawn until it has been drawn once
+        self._dirty_edges = []
+        self._dirty_nodes = []
+        self._graph_drawn = False
 
+        super().__init__(heap_array, start_steps(dijkstra_steps, graph, source, target), x, y)
 
-class Dijkstra:
-    def __init__(self) -> None:
-        pass
+    @property
+    def layout_pending(self) -> bool:
+        # True while the graph is being laid out in the background, see GraphRenderer.update_layout
+        return self.renderer.layout_pending
+
+    def close(self) -> None:
+        self.renderer.close()
+        super().close()
+
+    def _heap_written(self, index: int, node: int) -> None:
+        self.cell_array_obj.set_value(index, self.heap.key(node))
+        self.cell_array_obj.set_active(index)
+        self.cell_array_obj.focus = index
+
+    def _set_node_state(self, node: int, state: int) -> None:
+        self.node_states[node] = state
+        self._dirty_nodes.append(node)
+
+    def snapshot(self) -> tuple:
+        return (super().snapshot(), self.heap.snapshot(), bytes(self.dist), bytes(self.pred), bytes(self.node_states),
+                self.current_node, self.current_edge)
+
+    def restore(self, snapshot: tuple) -> None:
+        base_snapshot, heap_snapshot, dist, pred, node_states, self.current_node, self.current_edge = snapshot
+        super().restore(base_snapshot)
+        self.heap.restore(heap_snapshot)
+        memoryview(self.dist).cast("B")[:] = dist
+        memoryview(self.pred).cast("B")[:] = pred
+        self.node_states[:] = node_states
+        self._graph_drawn = False
+
+    def apply_event(self, event: StepEvent) -> None:
+        op, a, b, c = event
+        if op == Op.RELAX:
+            self.dist[a] = c
+            self.pred[a] = b
+            self.heap.push_or_decrease(a, c)
+            self._set_node_state(a, FRONTIER)
+        elif op == Op.HEAP_POP:
+            self.heap.pop()
+            self.cell_array_obj.set_inactive(len(self.heap))
+            self._set_node_state(a, SETTLED)
+            self.current_node, self.current_edge = a, -1
+        elif op == Op.EDGE_SCAN:
+            # Reading the edge's weight and comparing the new distance, heap writes are counted as they happen
+            self.cell_array_obj.count(READS)
+            self.cell_array_obj.count(COMPARISONS)
+            # The previous edge goes from highlighted to scanned
+            if self.current_edge != -1:
+                self._dirty_edges.append((b, self.graph.targets[self.current_edge], colors.PRIMARY_COLOR))
+            self.current_edge = a
+            v = self.graph.targets[a]
+            self._dirty_edges.append((b, v, colors.SELECTED_COLOR))
+            self._dirty_nodes.extend((b, v))
+        elif op == Op.SOLVED:
+            self._mark_path()
+            super().apply_event(event)
+        else:
+            super().apply_event(event)
+
+    def _mark_path(self) -> None:
+        # Colors the shortest path to the target once it is settled
+        if self.target is None or self.node_states[self.target] != SETTLED:
+            return
+        node = self.target
+        while node != self.source:
+            self._dirty_edges.append((self.pred[node], node, colors.SOLUTION))
+            self._set_node_state(node, PATH)
+            node = self.pred[node]
+        self._set_node_state(node, PATH)
+
+    def _draw_graph(self, screen: pygame.Surface) -> pygame.Rect:
+        # Every examined edge is drawn over the unvisited graph, then the shortest path, then every reached node
+        rect = self.renderer.draw(screen)
+        renderer, offsets, targets, node_states = self.renderer, self.graph.offsets, self.graph.targets, self.node_states
+        for u in range(self.graph.num_nodes):
+            if node_states[u] == UNSEEN or node_states[u] == FRONTIER:
+                continue
+            stop = self.current_edge + 1 if u == self.current_node else offsets[u + 1]
+            for e in range(offsets[u], stop):
+                renderer.draw_edge(screen, u, targets[e], colors.PRIMARY_COLOR)
+        if self.current_edge != -1:
+            renderer.draw_edge(screen, self.current_node, targets[self.current_edge], colors.SELECTED_COLOR)
+        for u in range(self.graph.num_nodes):
+            if node_states[u] == PATH and u != self.source:
+                renderer.draw_edge(screen, self.pred[u], u, colors.SOLUTION)
+        for u in range(self.graph.num_nodes):
+            if node_states[u] != UNSEEN:
+                renderer.draw_node(screen, u, NODE_COLORS[node_states[u]])
+
+        self._dirty_edges.clear()
+        self._dirty_nodes.clear()
+        self._graph_drawn = True
+        return rect
 
     def draw(self, screen: pygame.Surface) -> None:
-        pass
+        draw_text(screen, header, colors.SELECTED_COLOR, self.title, self.x, self.y - 100)
+        self.renderer.update_layout()
+        self._draw_graph(screen)
+        draw_text(screen, font, colors.SELECTED_COLOR, "Heap (distance of each queued node)", self.x, self.y + self.heap_offset - 80)
+        self.cell_array_obj.draw(self.x, self.y + self.heap_offset)
 
-    def next_step(self) -> None:
-        pass
\ No newline at end of file
+    def draw_dirty(self, screen: pygame.Surface) -> list[pygame.Rect]:
+        # Once the graph has been laid out every node and edge moves
+        if self.renderer.update_layout():
+            self._graph_drawn = False
+        if not self._graph_drawn:
+            rects = [self._draw_graph(screen)]
+        else:
+            renderer = self.renderer
+            rects = [renderer.draw_edge(screen, u, v, color) for u, v, color in self._dirty_edges]
+            rects.extend(renderer.draw_node(screen, u, NODE_COLORS[self.node_states[u]]) for u in self._dirty_nodes)
+            self._dirty_edges.clear()
+            self._dirty_nodes.clear()
+        return rects + self.cell_array_obj.draw_dirty(self.x, self.y + self.heap_offset)
+
+
+class DijkstraUI:
+    def __init__(self, screen: pygame.Surface) -> None:
+        self.input_boxes = [
+            InputBox(screen, "Graph (@edge list file, grid:WxH or random:n:m)", 50, 140, 500, 50, 200),
+            InputBox(screen, "Source node", 50, 240, 240, 50),
+            InputBox(screen, "Target node (optional)", 310, 240, 240, 50)
+        ]
+        self.buttons = [
+            Button(screen, "Submit", 50, 320, 125, 60, get_input_data(self.input_boxes))
+        ]
+
+
+def create_dijkstra(screen: pygame.Surface, user_input: str, source: str, target: str, x: int, y: int) -> Dijkstra:
+    """Creates a Dijkstra from the text typed into the DijkstraUI, an empty target finds every distance.
+
+    Raises:
+        ValueError: If the graph, the source or the target is invalid.
+    """
+    graph = graph_init(user_input)
+    if graph is None:
+        raise ValueError(f"Invalid graph {user_input}")
+    return Dijkstra(screen, graph, int(source), int(target) if target.strip() else None, x, y)
@@ -0,0 +1,158 @@
+import pygame
+from math import ceil
+from typing import Optional
+
+from config import colors
+from steps import CellState
+
+
+# Colors of each state, the first state found in a column (in this order) colors the whole column
+STATE_PRIORITY = (
+    (CellState.SELECTED, colors.SELECTED_COLOR),
+    (CellState.ACTIVE, colors.PRIMARY_COLOR),
+    (CellState.SOLUTION, colors.SOLUTION),
+    (CellState.INACTIVE, colors.INACTIVE_COLOR)
+)
+
+
+# Draws the values of a CellArray as a bar chart on an offscreen surface
+# Each column of pixels shows one value, or the largest value of a group of neighbouring values when there are more values than columns.
+# Columns are written straight into the surface's pixels and only the columns of changed values are rewritten.
+class BarRenderer:
+    def __init__(self, cell_array, height: int) -> None:
+        # cell_array is the CellArray being drawn, its values and states are read on every update
+        self.cell_array = cell_array
+        self.height = height
+
+        self.surface = None
+        self.width = 0
+
+        # Number of values in each column and the pixel width of each column
+        self.per_column = 1
+        self.column_width = 1
+        self.columns = 0
+
+        # Smallest and largest value, bar heights are scaled between them
+        self._low = 0
+        self._high = 0
+
+        # Number of values when the layout was made, and the mapped pixel colors of the surface
+        self._length = 0
+        self._mapped_colors = []
+        self._background = 0
+
+    def layout(self, width: int) -> bool:
+        """Fits the values into the given width, returning True if the layout changed and every column must be redrawn."""
+        n = len(self.cell_array.values)
+        if self.surface is not None and width == self.width and n == self._length:
+            return False
+
+        self.width = max(1, width)
+        self.per_column = max(1, ceil(n / self.width))
+        self.columns = ceil(n / self.per_column)
+        self.column_width = max(1, self.width // max(1, self.columns))
+        self._length = n
+
+        values = self.cell_array.values
+        self._low, self._high = (min(values), max(values)) if n else (0, 0)
+
+        self.surface = pygame.Surface((self.width, self.height))
+        self.surface.fill(colors.BACKGROUND_COLOR)
+        self._mapped_colors = [(state.value, self.surface.map_rgb(pygame.Color(color))) for state, color in STATE_PRIORITY]
+        self._background = self.surface.map_rgb(pygame.Color(colors.BACKGROUND_COLOR))
+        return True
+
+    def value_range(self) -> Optional[tuple[int, int]]:
+        """Returns the smallest and largest value the bars are scaled between, None before the first layout."""
+        return None if self.surface is None else (self._low, self._high)
+
+    def include(self, low: int, high: int) -> bool:
+        """Widens the scale to include values between low and high, returning True if it changed and every column
+        must be redrawn. Values written after the layout (e.g. the keys of a growing heap) can lie outside it."""
+        if self.surface is None or (self._low <= low and high <= self._high):
+            return False
+        self._low, self._high = min(self._low, low), max(self._high, high)
+        return True
+
+    def bar_height(self, value: int) -> int:
+        if self._high == self._low:
+            return self.height
+        return 1 + (value - self._low) * (self.height - 1) // (self._high - self._low)
+
+    def update_columns(self, first: int, stop: int) -> None:
+        """Rewrites the pixels of the columns in the half-open range first..stop."""
+        values, states = self.cell_array.values, self.cell_array.states
+        per_column, column_width, height = self.per_column, self.column_width, self.height
+
+        with pygame.PixelArray(self.surface) as pixels:
+            for column in range(first, stop):
+                start = column * per_column
+                end = min(start + per_column, len(values))
+
+                if per_column == 1:
+                    value = values[start]
+                    state = states[start]
+                    color = next(mapped for code, mapped in self._mapped_colors if code == state)
+                else:
+                    value = max(values[start:end])
+                    color = next(mapped for code, mapped in self._mapped_colors if states.find(code, start, end) != -1)
+
+                x = column * column_width
+                top = height - self.bar_height(value)
+                pixels[x:x + column_width, 0:top] = self._background
+                pixels[x:x + column_width, top:height] = color
+
+    def columns_of(self, ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+        """Converts sorted half-open index ranges into merged half-open column ranges."""
+        columns = []
+        for start, stop in ranges:
+            first, last = start // self.per_column, (stop - 1) // self.per_column + 1
+            if columns and first <= columns[-1][1]:
+                columns[-1] = (columns[-1][0], max(columns[-1][1], last))
+            else:
+                columns.append((first, last))
+        return columns
+
+    def draw(self, screen: pygame.Surface, x: int, y: int, width: int, ranges: list[tuple[int, int]]) -> pygame.Rect:
+        """Brings the changed columns up to date and draws the whole chart.
+
+        Args:
+            screen (pygame.Surface): The pygame screen.
+            x (int): x-position of chart.
+            y (int): y-position of chart.
+            width (int): Width of chart.
+            ranges (list[tuple[int, int]]): Sorted half-open index ranges changed since the last draw.
+
+        Returns:
+            pygame.Rect: The area of the screen that was drawn over.
+        """
+        if self.layout(width):
+            self.update_columns(0, self.columns)
+        else:
+            for first, stop in self.columns_of(ranges):
+                self.update_columns(first, stop)
+        return screen.blit(self.surface, (x, y))
+
+    def draw_dirty(self, screen: pygame.Surface, x: int, y: int, width: int, ranges: list[tuple[int, int]]) -> list[pygame.Rect]:
+        """Only redraws and blits the columns of values that changed since the last draw.
+
+        Args:
+            screen (pygame.Surface): The pygame screen.
+            x (int): x-position of chart.
+            y (int): y-position of chart.
+            width (int): Width of chart.
+            ranges (list[tuple[int, int]]): Sorted half-open index ranges changed since the last draw.
+
+        Returns:
+            list[pygame.Rect]: The areas of the screen that were drawn over.
+        """
+        if self.layout(width):
+            self.update_columns(0, self.columns)
+            return [screen.blit(self.surface, (x, y))]
+
+        rects = []
+        for first, stop in self.columns_of(ranges):
+            self.update_columns(first, stop)
+            area = pygame.Rect(first * self.column_width, 0, (stop - first) * self.column_width, self.height)
+            rects.append(screen.blit(self.surface, (x + area.x, y), area))
+        return rects
@@ -0,0 +1,216 @@
+import pygame
+from collections import Counter
+from itertools import compress
+from math import ceil, isqrt
+from time import perf_counter
+from typing import Optional, Sequence, Union
+
+from algorithms import BinarySearch
+from cell import CellArray, COMPARISONS, COUNTER_NAMES, READS
+from config import colors, header, font
+from steps import binary_search_batch, is_sorted
+from widgets import draw_text
+from utils import cell_array_init, parse_values
+
+
+# Many binary searches over the same sorted values, resolved at once (see steps.binary_search_batch)
+# and shown as aggregates: how many probes each index got, how many probes each search took, and which queries were found.
+# Clicking a query in the hit/miss map drills into the step by step search for it, escape returns to the aggregates.
+# While drilling in the batch is stepped like the single search it shows.
+class BatchSearch:
+    title = "Binary Search Batch"
+
+    # Size of the probe depth histogram and of the hit/miss map, drawn side by side below the probe heat
+    panel_width = 330
+    panel_height = 140
+
+    def __init__(self, screen: pygame.Surface, values: Sequence[int], queries: Sequence[int], x: int, y: int) -> None:
+        """
+        Args:
+            screen (pygame.Surface): The pygame screen.
+            values (Sequence[int]): The sorted values to search.
+            queries (Sequence[int]): The values to find.
+            x (int): x-position of the batch.
+            y (int): y-position of the probe heat, the title is drawn 100 pixels above it.
+
+        Raises:
+            ValueError: If the values are not sorted, as every search would give wrong answers.
+        """
+        if not is_sorted(values):
+            raise ValueError("Binary search needs the array to be sorted")
+
+        self.screen = screen
+        self.values = values
+        self.queries = queries
+        self.x = x
+        self.y = y
+
+        start = perf_counter()
+        self.result = binary_search_batch(values, queries)
+        self.resolve_time = perf_counter() - start
+        self.hits = sum(index != -1 for index in self.result.found)
+        self.probes = sum(self.result.depth)
+
+        # Probes of every index, drawn like the values of an array, never probed indices are inactive and found ones solutions
+        self.heat_array_obj = CellArray(screen, self.result.heat)
+        self.heat_array_obj.bars.height = 100
+        self.heat_array_obj.set_follow(False)
+        self.heat_array_obj.set_inactive(0, len(values) - 1)
+        for index in compress(range(len(values)), self.result.heat):
+            self.heat_array_obj.set_active(index)
+        for index in set(self.result.found) - {-1}:
+            self.heat_array_obj.set_solution(index)
+
+        # Number of searches that took each number of probes
+        depths = Counter(self.result.depth)
+        self.histogram = [depths[depth] for depth in range(1, max(depths, default=0) + 1)]
+
+        # The hit/miss map shows every query as a square when they fit, otherwise each square stands for several queries
+        self.map_rect = pygame.Rect(x + self.panel_width + 40, y + 185, self.panel_width, self.panel_height)
+        count = max(1, len(queries))
+        self.square = max(1, min(40, isqrt(self.map_rect.width * self.map_rect.height // count)))
+        self.map_columns = max(1, self.map_rect.width // self.square)
+        self.per_square = max(1, ceil(count / (self.map_columns * (self.map_rect.height // self.square))))
+
+        # Single search being drilled into, and the query it is for
+        self.trace = None
+        self.trace_query = None
+
+    @property
+    def cell_array_obj(self) -> CellArray:
+        # Zooming and scrolling act on the search being drilled into, otherwise on the probe heat
+        return self.trace.cell_array_obj if self.trace else self.heat_array_obj
+
+    @property
+    def solved(self) -> bool:
+        return self.trace.solved if self.trace else True
+
+    @property
+    def step_count(self) -> int:
+        return self.trace.step_count if self.trace else 0
+
+    def get_counts(self) -> dict[str, int]:
+        # Every probe reads one value and compares it with the query
+        if self.trace:
+            return self.trace.get_counts()
+        counts = dict.fromkeys(COUNTER_NAMES, 0)
+        counts[COUNTER_NAMES[READS]] = counts[COUNTER_NAMES[COMPARISONS]] = self.probes
+        return counts
+
+    def select_query(self, query: Optional[int]) -> None:
+        """Drills into the search for a query (by its position in the batch), or returns to the aggregates if it is None."""
+        self.close()
+        self.trace = None
+        self.trace_query = query
+        if query is not None:
+            # The values were checked to be sorted once already
+            self.trace = BinarySearch(CellArray(self.screen, self.values), self.queries[query], self.x, self.y, check_sorted=False)
+
+    def query_at(self, mouse_x: int, mouse_y: int) -> Optional[int]:
+        """Returns the first query of the hit/miss map square under the mouse, or None."""
+        if self.trace or not self.map_rect.collidepoint(mouse_x, mouse_y):
+            return None
+        column = (mouse_x - self.map_rect.x) // self.square
+        row = (mouse_y - self.map_rect.y) // self.square
+        if column >= self.map_columns:
+            return None
+        query = (row * self.map_columns + column) * self.per_square
+        return query if query < len(self.queries) else None
+
+    def is_step_ready(self) -> bool:
+        return self.trace.is_step_ready() if self.trace else True
+
+    def next_step(self) -> None:
+        if self.trace:
+            self.trace.next_step()
+
+    def previous_step(self) -> None:
+        if self.trace:
+            self.trace.previous_step()
+
+    def seek(self, step: int) -> None:
+        if self.trace:
+            self.trace.seek(step)
+
+    def close(self) -> None:
+        if self.trace:
+            self.trace.close()
+
+    def describe(self) -> str:
+        misses = len(self.queries) - self.hits
+        mean = self.probes / max(1, len(self.queries))
+        return (f"{len(self.queries)} queries, {self.hits} found, {misses} missing, {mean:.2f} probes each, "
+                f"resolved in {self.resolve_time * 1000:.1f} ms")
+
+    def _draw_histogram(self, screen: pygame.Surface, rect: pygame.Rect) -> None:
+        if not self.histogram:
+            return
+        width = max(1, rect.width // len(self.histogram))
+        tallest = max(self.histogram)
+        for i, count in enumerate(self.histogram):
+            height = 0 if count == 0 else max(1, count * (rect.height - 30) // tallest)
+            pygame.draw.rect(screen, colors.PRIMARY_COLOR, (rect.x + i * width, rect.bottom - 30 - height, max(1, width - 2), height))
+
+        # Probe counts are written under the bars when there is room, otherwise only under the first and last
+        labelled = range(len(self.histogram)) if width >= 24 else (0, len(self.histogram) - 1)
+        for i in labelled:
+            draw_text(screen, font, colors.PRIMARY_COLOR, i + 1, rect.x + i * width, rect.bottom - 26)
+
+    def _draw_map(self, screen: pygame.Surface) -> None:
+        found = self.result.found
+        rect, size, per_square = self.map_rect, self.square, self.per_square
+        for first in range(0, len(found), per_square):
+            square = first // per_square
+            row, column = divmod(square, self.map_columns)
+
+            # A square standing for several queries is only a hit if all of them are
+            hit = all(index != -1 for index in found[first:first + per_square])
+            color = colors.SOLUTION if hit else colors.INACTIVE_COLOR
+            screen.fill(color, (rect.x + column * size, rect.y + row * size, max(1, size - 1), max(1, size - 1)))
+
+    def draw(self, screen: pygame.Surface) -> None:
+        if self.trace:
+            self.trace.draw(screen)
+            query = self.queries[self.trace_query]
+            draw_text(screen, font, colors.SELECTED_COLOR,
+                      f"Query {self.trace_query + 1} of {len(self.queries)} ({query}), escape returns to the batch",
+                      self.x, screen.get_height() - 135)
+            return
+
+        draw_text(screen, header, colors.SELECTED_COLOR, self.title, self.x, self.y - 100)
+        draw_text(screen, font, colors.SELECTED_COLOR, self.describe(), self.x, self.y - 55)
+
+        # Boxed cells have their indices drawn above them
+        heat_y = self.y + (20 if self.heat_array_obj.render_mode == "bars" else 50)
+        draw_text(screen, font, colors.PRIMARY_COLOR, "Probes per index (found in green)", self.x, self.y - 25)
+        self.heat_array_obj.draw(self.x, heat_y)
+
+        histogram_rect = pygame.Rect(self.x, self.map_rect.y, self.panel_width, self.panel_height)
+        draw_text(screen, font, colors.PRIMARY_COLOR, "Searches by probes", histogram_rect.x, histogram_rect.y - 30)
+        self._draw_histogram(screen, histogram_rect)
+        draw_text(screen, font, colors.PRIMARY_COLOR, "Found (click to trace)", self.map_rect.x, self.map_rect.y - 30)
+        self._draw_map(screen)
+
+    def draw_dirty(self, screen: pygame.Surface) -> list[pygame.Rect]:
+        # The aggregates never change, only the probe heat's viewport does
+        if self.trace:
+            return self.trace.draw_dirty(screen)
+        heat_y = self.y + (20 if self.heat_array_obj.render_mode == "bars" else 50)
+        return self.heat_array_obj.draw_dirty(self.x, heat_y)
+
+
+def create_search(screen: pygame.Surface, user_input: str, value: str, x: int, y: int) -> Union[BinarySearch, BatchSearch]:
+    """Creates a BinarySearch from the text typed into the BinarySearchUI, or a BatchSearch if several values are given.
+
+    Raises:
+        ValueError: If the array or the values to find are invalid, or the array is not sorted.
+    """
+    cell_array = cell_array_init(screen, user_input)
+    if cell_array is None:
+        raise ValueError(f"Invalid array {user_input}")
+    queries = parse_values(value)
+    if queries is None:
+        raise ValueError(f"Invalid value to find {value}")
+    if len(queries) > 1:
+        return BatchSearch(screen, cell_array.values, queries, x, y)
+    return BinarySearch(cell_array, queries[0], x, y)
@@ -0,0 +1,230 @@
+import os
+
+# Drawing is benchmarked on offscreen surfaces, so SDL must not open a window (set before pygame is imported)
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import pygame
+from typing import Callable
+
+pygame.display.init()
+screen = pygame.display.set_mode((800, 600))
+
+from algorithms import BinarySearch, InsertionSort, MergeSort
+from cell import Cell, CellArray
+from utils import cell_array_init
+from widgets import Button, InputBox
+
+
+# Array sizes the step and parse benchmarks run over
+SIZES = [10, 100, 1_000, 10_000, 100_000, 1_000_000]
+QUICK_SIZES = [10, 100, 1_000, 10_000]
+
+
+def measure(setup: Callable[[], Callable[[], int]], repeats: int) -> dict[str, float]:
+    """Times a benchmark, returning the median and best seconds per operation.
+
+    Args:
+        setup (Callable[[], Callable[[], int]]): Builds the state for one repeat (untimed) and returns the timed
+            function, which returns the number of operations it performed.
+        repeats (int): Number of times to repeat the benchmark.
+    """
+    per_op = []
+    for _ in range(repeats):
+        run = setup()
+        start = time.perf_counter()
+        ops = run()
+        per_op.append((time.perf_counter() - start) / max(1, ops))
+    return {"median_s": statistics.median(per_op), "min_s": min(per_op)}
+
+
+def bench_binary_search_steps(n: int) -> Callable[[], int]:
+    # Steps through whole searches for random values in the array
+    values = list(range(n))
+    targets = [random.randrange(n) for _ in range(20)]
+
+    def setup():
+        searches = [BinarySearch(CellArray(screen, values), target) for target in targets]
+
+        def run():
+            steps = 0
+            for search in searches:
+                while not search.solved:
+                    search.next_step()
+                    steps += 1
+            return steps
+        return run
+    return setup
+
+
+def bench_insertion_sort_steps(n: int, steps: int = 2_000) -> Callable[[], int]:
+    # Steps through the start of a sort of random values
+    values = [random.randrange(n) for _ in range(n)]
+
+    def setup():
+        sort = InsertionSort(CellArray(screen, values), 50, 140)
+
+        def run():
+            count = 0
+            while count < steps and not sort.solved:
+                sort.next_step()
+                count += 1
+            return count
+        return run
+    return setup
+
+
+def bench_merge_sort_steps(n: int, steps: int = 2_000) -> Callable[[], int]:
+    # Steps through the start of a sort of random values
+    values = [random.randrange(n) for _ in range(n)]
+
+    def setup():
+        sort = MergeSort(CellArray(screen, values), 50, 140)
+
+        def run():
+            count = 0
+            while count < steps and not sort.solved:
+                sort.next_step()
+                count += 1
+            return count
+        return run
+    return setup
+
+
+def bench_cell_array_draw(n: int) -> Callable[[], int]:
+    def setup():
+        cell_array = CellArray(screen, [random.randrange(n) for _ in range(n)])
+        cell_array.draw(50, 140)
+
+        def run():
+            for _ in range(20):
+                cell_array.draw(50, 140)
+            return 20
+        return run
+    return setup
+
+
+def bench_cell_draw() -> Callable[[], int]:
+    def setup():
+        cells = [Cell(i) for i in range(100)]
+
+        def run():
+            for i, cell in enumerate(cells):
+                cell.draw(screen, (i % 15) * 50, 140)
+            return len(cells)
+        return run
+    return setup
+
+
+def bench_button_draw() -> Callable[[], int]:
+    def setup():
+        button = Button(screen, "Binary Search Algorithm", 50, 100, 260, 60, lambda: None)
+
+        def run():
+            for _ in range(100):
+                button.draw()
+            return 100
+        return run
+    return setup
+
+
+def bench_input_box_draw() -> Callable[[], int]:
+    def setup():
+        input_box = InputBox(screen, "Array to sort (seperated by commas)", 50, 140, 500, 50, 30)
+        input_box.textinput.value = "5, 3, 8, 1, 9, 2"
+
+        def run():
+            for _ in range(100):
+                input_box.draw([])
+            return 100
+        return run
+    return setup
+
+
+def bench_cell_array_init(n: int) -> Callable[[], int]:
+    user_input = ", ".join(str(random.randrange(n)) for _ in range(n))
+
+    def setup():
+        def run():
+            cell_array_init(screen, user_input)
+            return n
+        return run
+    return setup
+
+
+def run_benchmarks(sizes: list[int], repeats: int) -> dict[str, dict[str, float]]:
+    benchmarks = {}
+    for n in sizes:
+        benchmarks[f"step/binary_search/{n}"] = bench_binary_search_steps(n)
+        benchmarks[f"step/insertion_sort/{n}"] = bench_insertion_sort_steps(n)
+        benchmarks[f"step/merge_sort/{n}"] = bench_merge_sort_steps(n)
+        benchmarks[f"parse/cell_array_init/{n}"] = bench_cell_array_init(n)
+        benchmarks[f"draw/cell_array/{n}"] = bench_cell_array_draw(n)
+    benchmarks["draw/cell"] = bench_cell_draw()
+    benchmarks["draw/button"] = bench_button_draw()
+    benchmarks["draw/input_box"] = bench_input_box_draw()
+
+    results = {}
+    for name, setup in benchmarks.items():
+        results[name] = measure(setup, repeats)
+        print(f"{name:32} {results[name]['median_s'] * 1e6:12.3f} us/op", file=sys.stderr)
+    return results
+
+
+def compare(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]], threshold: float) -> list[str]:
+    """Returns a description of every benchmark whose median is more than threshold times slower than the baseline."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["median_s"] / baseline[name]["median_s"]
+        if ratio > threshold:
+            regressions.append(f"{name}: {ratio:.2f}x slower than baseline")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the step, draw and parse paths of the visualizer")
+    parser.add_argument("--quick", action="store_true", help="only run array sizes up to 10,000")
+    parser.add_argument("--repeats", type=int, default=5, help="number of times each benchmark is repeated")
+    parser.add_argument("--output", help="file to write the JSON results to (default: stdout)")
+    parser.add_argument("--baseline", help="JSON results to compare against, exits with status 1 on a regression")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio counted as a regression")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the generated inputs")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    results = run_benchmarks(QUICK_SIZES if args.quick else SIZES, args.repeats)
+    report = {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "results": results
+    }
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
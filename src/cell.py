@@ -1,15 +1,54 @@
 import pygame
-from enum import Enum
+from array import array
+from math import ceil
+from typing import Sequence
 
-from config import rect_size, border_size, Color, colors, font
+from bars import BarRenderer
+from config import rect_size, border_size, Color, colors, font, bar_mode_threshold, bar_height
+from steps import CellState, Op, StepEvent, KEY, READS, WRITES, COMPARISONS, SWAPS, COUNTER_NAMES
 from widgets import draw_centered_text
 
 
-# Enumeration containing all the states a cell could be in
-class CellState(Enum):
-    ACTIVE = 1
-    INACTIVE = 2
-    SELECTED = 3
+# Color of each state, indexed by the state's value
+STATE_COLORS = (None, colors.PRIMARY_COLOR, colors.INACTIVE_COLOR, colors.SELECTED_COLOR, colors.SOLUTION)
+
+# Single byte code of each state, as stored in CellArray.states
+STATE_CODES = tuple(bytes((state.value,)) for state in CellState)
+
+
+def draw_cell(screen: pygame.Surface, value: int, color: Color, x: int, y: int, size: int = rect_size) -> pygame.Rect:
+    """Draws a single cell containing a value.
+
+    Args:
+        screen (pygame.Surface): The pygame screen.
+        value (int): The value to draw inside the cell.
+        color (Color): The color of the border and value.
+        x (int): x-position of cell.
+        y (int): y-position of cell.
+        size (int, optional): Width and height of the cell, values are only drawn at the full rect_size or larger.
+
+    Returns:
+        pygame.Rect: The area of the screen that was drawn over.
+    """
+
+    # Create Rect object
+    rect = pygame.Rect(x, y, size, size)
+
+    # Borders shrink with the cell, cells too small for a border are filled in
+    border = max(1, border_size * size // rect_size)
+    if size <= 2 * border:
+        pygame.draw.rect(screen, color, rect)
+        return rect
+
+    # Draw cell and border
+    pygame.draw.rect(screen, colors.BACKGROUND_COLOR, rect)
+    pygame.draw.rect(screen, color, rect, border)
+
+    # Render text in cell
+    if size >= rect_size:
+        padding = size / 2
+        draw_centered_text(screen, font, color, value, x + padding, y + padding)
+    return rect
 
 
 # A Cell class containing a value and visual state
@@ -21,35 +60,26 @@ class Cell:
 
     def __str__(self) -> str:
         return f"Cell({self.value}, {self.state.name})"
-    
-    def draw(self, screen: pygame.Surface, x: int, y: int) -> None:
+
+    def draw(self, screen: pygame.Surface, x: int, y: int) -> pygame.Rect:
         """Draws a single cell with its label and visual state.
 
         Args:
             screen (pygame.Surface): The pygame screen.
             x (int): x-position of cell.
             y (int): y-position of cell.
-        """
-
-        color = self.get_color()
-        
-        # Create Rect object
-        rect = pygame.Rect(x, y, rect_size, rect_size)
-        
-        # Draw cell and border
-        pygame.draw.rect(screen, colors.BACKGROUND_COLOR, rect)
-        pygame.draw.rect(screen, color, rect, border_size)
 
-        # Render text in cell
-        padding = rect_size / 2
-        draw_centered_text(screen, font, color, self.value, x + padding, y + padding)
+        Returns:
+            pygame.Rect: The area of the screen that was drawn over.
+        """
+        return draw_cell(screen, self.value, self.get_color(), x, y)
 
     def set_active(self) -> None:
         self.state = CellState.ACTIVE
-    
+
     def set_inactive(self) -> None:
         self.state = CellState.INACTIVE
-    
+
     def set_selected(self) -> None:
         self.state = CellState.SELECTED
 
@@ -64,78 +94,321 @@ class Cell:
         """
         if self.custom_color:
             return self.custom_color
-        else:
-            match self.state:
-                case CellState.ACTIVE:
-                    return colors.PRIMARY_COLOR
-                case CellState.INACTIVE:
-                    return colors.INACTIVE_COLOR
-                case _:
-                    return colors.SELECTED_COLOR
+        return STATE_COLORS[self.state.value]
 
 
 # CellArray class with methods to operate on all cells
+# Values are kept in a typed array and states in a parallel byte buffer (one CellState value per cell),
+# so range updates are slice assignments and no per-cell Python objects are allocated
 class CellArray():
-    def __init__(self, screen: pygame.Surface, array: list[int]) -> None:
+    def __init__(self, screen: pygame.Surface, values: Sequence[int]) -> None:
         self.screen = screen
-        self.cell_array = [Cell(value) for value in array]
+
+        # Typed arrays and memoryviews (e.g. memory-mapped datasets) are used as they are rather than copied,
+        # so large inputs are not held in memory twice
+        # Read-only memoryviews can be shared by several CellArrays, each copies the values on its first write
+        if isinstance(values, (array, memoryview)):
+            self.values = values
+        else:
+            self.values = array("q", values)
+        self._shared = isinstance(self.values, memoryview) and self.values.readonly
+
+        # Number of each operation (READS, WRITES, COMPARISONS and SWAPS) algorithms did on the values,
+        # counted once per step event rather than per element access so counting costs almost nothing
+        self.counters = array("q", [0]) * len(COUNTER_NAMES)
+        self.states = bytearray([CellState.ACTIVE.value]) * len(self.values)
+
+        # Half-open (start, stop) index ranges changed since the last draw
+        self._dirty_ranges = []
+
+        # Viewport, only the cells inside it are drawn
+        # scroll is the index of the first visible cell, and cell_size the on-screen size of each cell
+        self.scroll = 0
+        self.cell_size = rect_size
+        self.view_width = screen.get_width()
+
+        # Index of the last cell an algorithm worked on, followed by the viewport when follow is set
+        self.focus = None
+        self.follow = True
+
+        # (first index, cell size) of the last full draw, when it changes everything has to be redrawn
+        self._drawn_view = None
+
+        # Long arrays are drawn as a bar chart ("bars") rather than boxed cells ("cells")
+        self.render_mode = "bars" if len(self.values) > bar_mode_threshold else "cells"
+        self.bars = BarRenderer(self, bar_height)
 
     def __str__(self) -> str:
-        return "[" + ", ".join(str(cell) for cell in self.cell_array) + "]"
-    
+        return "[" + ", ".join(str(self.get_cell(i)) for i in range(len(self))) + "]"
+
     def __len__(self) -> int:
-        return len(self.cell_array)
-    
+        return len(self.values)
+
+    def get_cell(self, index: int) -> Cell:
+        """Returns a standalone Cell copy of the value and state at an index."""
+        return Cell(self.values[index], CellState(self.states[index]))
+
+    def get_value(self, index: int) -> int:
+        # A read by an algorithm, drawing reads the values directly so it is not counted
+        self.counters[READS] += 1
+        return self.values[index]
+
+    def count(self, counter: int, amount: int = 1) -> None:
+        self.counters[counter] += amount
+
+    def get_counts(self) -> dict[str, int]:
+        return dict(zip(COUNTER_NAMES, self.counters))
+
+    def get_state(self, index: int) -> CellState:
+        return CellState(self.states[index])
+
+    def visible_range(self) -> tuple[int, int]:
+        """Returns the half-open range of indices that fit inside the viewport."""
+        count = max(1, self.view_width // self.cell_size)
+        first = min(max(0, int(self.scroll)), max(0, len(self.values) - count))
+        return first, min(len(self.values), first + count)
+
+    def scroll_by(self, cells: float) -> None:
+        # Scrolling by hand stops the viewport following the algorithm
+        self.follow = False
+        self.scroll = self._clamp_scroll(self.scroll + cells)
+
+    def zoom_by(self, factor: float) -> None:
+        # Zooms around the middle of the viewport
+        first, stop = self.visible_range()
+        middle = (first + stop) / 2
+        self.cell_size = min(rect_size * 2, max(4, round(self.cell_size * factor)))
+        count = self.view_width // self.cell_size
+        self.scroll = self._clamp_scroll(middle - count / 2)
+
+    def set_follow(self, follow: bool) -> None:
+        self.follow = follow
+
+    def _clamp_scroll(self, scroll: float) -> float:
+        count = max(1, self.view_width // self.cell_size)
+        return min(max(0, scroll), max(0, len(self.values) - count))
+
+    def _follow_focus(self) -> None:
+        # Recenters the viewport once the focused cell leaves it
+        if not self.follow or self.focus is None:
+            return
+        first, stop = self.visible_range()
+        if not first <= self.focus < stop:
+            self.scroll = self._clamp_scroll(self.focus - (stop - first) / 2)
+
+    def get_view_rect(self, x_offset: int, y_offset: int) -> pygame.Rect:
+        # Area covered by the visible cells and the index labels above them, or by the bar chart
+        if self.render_mode == "bars":
+            return pygame.Rect(x_offset, y_offset, self.view_width, self.bars.height)
+        return pygame.Rect(x_offset, y_offset - rect_size, self.view_width, rect_size + self.cell_size)
+
+    def toggle_render_mode(self) -> None:
+        self.render_mode = "cells" if self.render_mode == "bars" else "bars"
+
     def draw(self, x_offset: int, y_offset: int) -> None:
-        """Draws a horizontal sequence of cells, where each cell corresponds to an element in the given cell array.
+        """Draws a horizontal sequence of the cells inside the viewport, where each cell corresponds to an element in the given cell array.
 
         Args:
             x_offset (int): x-offset from top left corner of screen.
             y_offset (int): y-offset from top left corner of screen.
         """
+        self.view_width = self.screen.get_width() - 2 * x_offset
+        if self.render_mode == "bars":
+            self.bars.draw(self.screen, x_offset, y_offset, self.view_width, self.pop_dirty_ranges())
+            return
+        self._follow_focus()
 
-        for i, cell in enumerate(self.cell_array):
+        size = self.cell_size
+        first, stop = self.visible_range()
+
+        # Small cells only label every few indices so the labels do not overlap
+        label_every = ceil(rect_size / size)
+
+        # Labels are clipped so they never spill outside the viewport
+        previous_clip = self.screen.get_clip()
+        self.screen.set_clip(self.get_view_rect(x_offset, y_offset))
+
+        for i in range(first, stop):
             # Position of cell
-            x = x_offset + (i * rect_size)
+            x = x_offset + ((i - first) * size)
             y = y_offset + 0
 
             # Draw index above cell
-            draw_centered_text(self.screen, font, colors.SELECTED_COLOR, f"{i}", x + rect_size / 2, y - rect_size / 2)
+            if i % label_every == 0:
+                draw_centered_text(self.screen, font, colors.SELECTED_COLOR, f"{i}", x + size / 2, y - rect_size / 2)
 
-            cell.draw(self.screen, x, y)
+            draw_cell(self.screen, self.values[i], STATE_COLORS[self.states[i]], x, y, size)
 
-    def set_active(self, start: int, end: int = None) -> None:
+        self.screen.set_clip(previous_clip)
+        self._drawn_view = (first, size)
+        self._dirty_ranges.clear()
+
+    def draw_dirty(self, x_offset: int, y_offset: int) -> list[pygame.Rect]:
+        """Redraws only the visible cells that changed since the last draw, or the whole viewport if it moved.
+
+        Args:
+            x_offset (int): x-offset from top left corner of screen.
+            y_offset (int): y-offset from top left corner of screen.
+
+        Returns:
+            list[pygame.Rect]: The areas of the screen that were drawn over.
+        """
+        self.view_width = self.screen.get_width() - 2 * x_offset
+        if self.render_mode == "bars":
+            return self.bars.draw_dirty(self.screen, x_offset, y_offset, self.view_width, self.pop_dirty_ranges())
+        self._follow_focus()
+
+        size = self.cell_size
+        first, stop = self.visible_range()
+        if self._drawn_view != (first, size):
+            view_rect = self.get_view_rect(x_offset, y_offset)
+            self.screen.fill(colors.BACKGROUND_COLOR, view_rect)
+            self.draw(x_offset, y_offset)
+            return [view_rect]
+
+        rects = []
+        for start, end in self.pop_dirty_ranges():
+            # Cells outside the viewport are culled
+            for i in range(max(start, first), min(end, stop)):
+                x = x_offset + ((i - first) * size)
+                rects.append(draw_cell(self.screen, self.values[i], STATE_COLORS[self.states[i]], x, y_offset, size))
+        return rects
+
+    def pop_dirty_ranges(self) -> list[tuple[int, int]]:
+        """Returns the sorted, merged ranges changed since the last draw and clears them."""
+        merged = []
+        for start, stop in sorted(self._dirty_ranges):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+            else:
+                merged.append((start, stop))
+        self._dirty_ranges.clear()
+        return merged
+
+    def is_dirty(self) -> bool:
+        return bool(self._dirty_ranges)
+
+    def set_state(self, state: CellState, start: int, end: int = None) -> None:
+        """Sets the state of a single index, or of every index in the inclusive range start..end.
+
+        Only the span of the range whose state actually changes is written and marked for redrawing.
+        """
+        self._set_code(state.value, start, end)
+
+    def _set_code(self, code: int, start: int, end: int = None) -> None:
         if end is None:
             # Single index case
-            index = start
-            self.cell_array[index].set_active()
-        else:
-            # Range case
-            for i in range(start, end + 1):
-                self.cell_array[i].set_active()
+            if start < 0:
+                start += len(self.states)
+            end = start
+
+        stop = min(end + 1, len(self.states))
+        if start >= stop:
+            return
+
+        # Find the first and last cell not already in the state by searching for every other state code,
+        # which runs at memchr speed instead of comparing cells one at a time
+        states = self.states
+        first, last = stop, start
+        for other in STATE_CODES:
+            if other[0] == code:
+                continue
+            index = states.find(other, start, stop)
+            if index != -1:
+                first = min(first, index)
+                last = max(last, states.rfind(other, start, stop) + 1)
+        if first >= last:
+            return
+
+        states[first:last] = bytes((code,)) * (last - first)
+        self._dirty_ranges.append((first, last))
+
+    def set_active(self, start: int, end: int = None) -> None:
+        self.set_state(CellState.ACTIVE, start, end)
 
     def set_inactive(self, start: int, end: int = None) -> None:
-        if end is None:
-            # Single index case
-            index = start
-            self.cell_array[index].set_inactive()
-        else:
-            # Range case
-            for i in range(start, end + 1):
-                self.cell_array[i].set_inactive()
+        self.set_state(CellState.INACTIVE, start, end)
 
     def set_selected(self, index: int) -> None:
-        self.cell_array[index].set_selected()
+        self.set_state(CellState.SELECTED, index)
 
     def set_solution(self, start: int, end: int = None) -> None:
-        if end is None:
-            # Single index case
-            index = start
-            self.cell_array[index].set_custom_color(colors.SOLUTION)
+        self.set_state(CellState.SOLUTION, start, end)
+
+    def snapshot(self) -> tuple:
+        """Returns a copy of the values, states and counters and the range the bars are scaled to,
+        in the form restore accepts."""
+        return bytes(self.values), bytes(self.states), bytes(self.counters), self.bars.value_range()
+
+    def _ensure_writable(self) -> None:
+        # Copy-on-write of shared values, keeping their type so snapshots taken before the copy still restore
+        if self._shared:
+            self.values = array(self.values.format, self.values)
+            self._shared = False
+
+    def restore(self, snapshot: tuple) -> None:
+        # Snapshots without a value range (trace keyframes, or taken before the first draw) are scanned for it
+        values, states, counters, *value_range = snapshot
+        self._ensure_writable()
+        memoryview(self.values).cast("B")[:] = values
+        self.states[:] = states
+        memoryview(self.counters).cast("B")[:] = counters
+        value_range = value_range[0] if value_range else None
+        if value_range is None and len(self.values):
+            value_range = min(self.values), max(self.values)
+        if value_range is not None:
+            self.bars.include(*value_range)
+        self._dirty_ranges.append((0, len(self.states)))
+
+    def apply(self, event: StepEvent) -> None:
+        """Applies a step event from the step engine to the cells. Events that do not change cells are ignored."""
+        op, a, b, c = event
+        if op == Op.SWAP:
+            self.swap(a, b)
+            self.focus = b
+        elif op == Op.COMPARE:
+            self.compare(a, b)
+            self.focus = a
+        elif op == Op.MARK_RANGE:
+            self._set_code(c, a, b)
+            if c == CellState.SELECTED.value:
+                self.focus = a
+
+    def compare(self, i1: int, i2: int) -> None:
+        # Records a comparison of the values at two indices, or of one value and a search KEY
+        counters = self.counters
+        counters[COMPARISONS] += 1
+        counters[READS] += 1 if i2 == KEY else 2
+
+    def set_value(self, index: int, value: int) -> None:
+        self._ensure_writable()
+        self.counters[WRITES] += 1
+        self.values[index] = value
+        if self.bars.include(value, value):
+            self._dirty_ranges.append((0, len(self.values)))
+        else:
+            self._dirty_ranges.append((index, index + 1))
+
+    def copy_values(self, source: "CellArray", start: int, stop: int) -> None:
+        """Copies the values of another CellArray in the half-open range start..stop into the same indices."""
+        self._ensure_writable()
+        target_view, source_view = memoryview(self.values)[start:stop], memoryview(source.values)[start:stop]
+        if target_view.format == source_view.format:
+            target_view[:] = source_view
         else:
-            # Range case
-            for i in range(start, end + 1):
-                self.cell_array[i].set_custom_color(colors.SOLUTION)
+            for i in range(start, stop):
+                self.values[i] = source.values[i]
+        self.counters[WRITES] += stop - start
+        source.counters[READS] += stop - start
+        self._dirty_ranges.append((start, stop))
 
     def swap(self, i1: int, i2: int) -> None:
-        self.cell_array[i1], self.cell_array[i2] = self.cell_array[i2], self.cell_array[i1]
\ No newline at end of file
+        self._ensure_writable()
+        values, states, counters = self.values, self.states, self.counters
+        values[i1], values[i2] = values[i2], values[i1]
+        states[i1], states[i2] = states[i2], states[i1]
+        counters[SWAPS] += 1
+        counters[READS] += 2
+        counters[WRITES] += 2
+        self._dirty_ranges.append((i1, i1 + 1))
+        self._dirty_ranges.append((i2, i2 + 1))
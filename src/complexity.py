@@ -0,0 +1,119 @@
+import math
+from collections import namedtuple
+from time import perf_counter
+from typing import Any, Iterator, Sequence
+
+from datasets import KINDS
+from runner import RUNNERS, run_case
+
+
+# Empirical complexity: runs an algorithm headless (see runner.py) over inputs of growing size and fits
+# how its steps and time grow against the usual complexity classes
+
+# Complexity classes fitted against, by name, as functions of the input size
+MODELS = {
+    "O(log n)": lambda n: math.log2(n),
+    "O(n)": lambda n: n,
+    "O(n log n)": lambda n: n * math.log2(n),
+    "O(n²)": lambda n: n * n,
+}
+
+# Kinds of generated graph for algorithms run on graphs, grids are the largest square grid of at most n nodes
+GRAPH_KINDS = ("grid", "random")
+
+# A model scaled to the measurements, with the root mean square of its relative error
+Fit = namedtuple("Fit", ["model", "coefficient", "error"])
+
+
+def check_kinds(algorithm: str, kinds: Sequence[str]) -> None:
+    """Raises a ValueError if the algorithm is not one the runner knows or can not run on one of the input kinds."""
+    if algorithm not in RUNNERS:
+        raise ValueError(f"Unknown algorithm {algorithm}, expected one of {', '.join(RUNNERS)}")
+    if not kinds:
+        raise ValueError("At least one input kind is needed")
+    valid = GRAPH_KINDS if RUNNERS[algorithm].graph_input else KINDS
+    for kind in kinds:
+        if kind not in valid:
+            raise ValueError(f"Unknown input kind {kind}, expected one of {', '.join(valid)}")
+    if algorithm == "bsa" and set(kinds) != {"sorted"}:
+        raise ValueError("Binary search needs sorted input, use the sorted input kind")
+
+
+def parse_exponents(text: str, default: range = range(4, 21)) -> list[int]:
+    """Returns the exponents of the sizes (as powers of two) typed as a range ("4-20") or a comma seperated list,
+    or default if the text is empty.
+
+    Raises:
+        ValueError: If the text is neither, or an exponent is not between 1 and 24.
+    """
+    text = "".join(text.split())
+    if not text:
+        return list(default)
+    if "-" in text:
+        first, last = map(int, text.split("-"))
+        exponents = list(range(first, last + 1))
+    else:
+        exponents = [int(exponent) for exponent in text.split(",")]
+    if not exponents or min(exponents) < 1 or max(exponents) > 24:
+        raise ValueError(f"Invalid sizes {text}, expected exponents between 1 and 24 such as 4-20")
+    return exponents
+
+
+def input_spec(algorithm: str, kind: str, n: int, seed: int) -> str:
+    """Returns the dataset or graph spec of a generated input of about n values or nodes."""
+    if not RUNNERS[algorithm].graph_input:
+        return f"{kind}:{n}:{seed}"
+    if kind == "grid":
+        side = max(2, math.isqrt(n))
+        return f"grid:{side}x{side}:{seed}"
+    return f"random:{n}:{3 * n}:{seed}"
+
+
+def measure_growth(algorithm: str, kinds: Sequence[str], exponents: Sequence[int], max_seconds: float = 2.0,
+                   min_seconds: float = 0.01, seed: int = 0) -> Iterator[dict[str, Any]]:
+    """Yields the runner record (see runner.run_case) of the algorithm on every kind of input at sizes 2 ** exponent,
+    smallest sizes first, with the kind and the number of times the case was run added.
+
+    Small cases are run again until they took min_seconds in total and the fastest run's time is kept, so their time
+    is not just timer noise. Once a single run of a kind took longer than max_seconds its larger sizes are skipped.
+    """
+    slow = set()
+    for exponent in sorted(exponents):
+        for kind in kinds:
+            if kind in slow:
+                continue
+            case = {"index": exponent, "input": input_spec(algorithm, kind, 2 ** exponent, seed + exponent), "seed": seed}
+            runs, total, fastest, start = 0, 0.0, math.inf, perf_counter()
+            while True:
+                record = run_case(algorithm, case)
+                runs += 1
+                fastest = min(fastest, record.get("seconds", 0.0))
+                total = perf_counter() - start
+                if record["error"] is not None or total >= min_seconds or runs >= 100:
+                    break
+            if record["error"] is None:
+                record["seconds"] = fastest
+            record.update(kind=kind, runs=runs)
+            if fastest > max_seconds:
+                slow.add(kind)
+            yield record
+
+
+def fit_models(sizes: Sequence[int], values: Sequence[float]) -> list[Fit]:
+    """Fits every model to the measured values at each size, best fit first.
+
+    Each model is scaled by the coefficient that minimises its squared relative error, so small and large sizes
+    weigh the same. Measurements at sizes below 2 (where log n is 0) or of 0 are left out.
+    """
+    points = [(n, value) for n, value in zip(sizes, values) if n >= 2 and value > 0]
+    if not points:
+        return []
+
+    fits = []
+    for name, model in MODELS.items():
+        # Minimising sum((c * f / y - 1) ** 2) gives c = sum(f / y) / sum((f / y) ** 2)
+        ratios = [model(n) / value for n, value in points]
+        coefficient = sum(ratios) / sum(ratio * ratio for ratio in ratios)
+        error = math.sqrt(sum((coefficient * ratio - 1) ** 2 for ratio in ratios) / len(ratios))
+        fits.append(Fit(name, coefficient, error))
+    return sorted(fits, key=lambda fit: fit.error)
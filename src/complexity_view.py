@@ -0,0 +1,227 @@
+import math
+import pygame
+from time import perf_counter
+from typing import Any, Callable, Optional, Sequence
+
+from complexity import MODELS, Fit, check_kinds, fit_models, measure_growth, parse_exponents
+from config import analysis_max_seconds, colors, header, font, series_colors
+from runner import RUNNERS
+from widgets import draw_text, InputBox, Button
+from utils import get_input_data
+from workers import StepWorker
+
+
+# Plot of one measurement (e.g. steps) against the input size on log-log axes, where every complexity class is a line
+# Each input kind is a series of points in its own color with its best fitting model drawn through them
+class Plot:
+    def __init__(self, label: str, rect: pygame.Rect, value: Callable[[dict[str, Any]], float]) -> None:
+        """
+        Args:
+            label (str): Name of the measurement, drawn above the plot.
+            rect (pygame.Rect): Area of the axes.
+            value (Callable[[dict[str, Any]], float]): Gets the measurement from a runner record.
+        """
+        self.label = label
+        self.rect = rect
+        self.value = value
+
+    def draw(self, screen: pygame.Surface, series: list[tuple[list[dict[str, Any]], Optional[Fit]]]) -> None:
+        """Draws the axes and every series, given as its records (smallest size first) and its best fit or None."""
+        rect = self.rect
+        pygame.draw.rect(screen, colors.INACTIVE_COLOR, rect, 1)
+        draw_text(screen, font, colors.PRIMARY_COLOR, self.label, rect.x, rect.y - 30)
+
+        points = [(record["n"], self.value(record)) for records, _ in series for record in records]
+        points = [(n, value) for n, value in points if n >= 2 and value > 0]
+        if not points:
+            return
+
+        # Both axes are logarithmic and span the measurements, curves are clipped to the axes
+        low_n, high_n = math.log2(min(n for n, _ in points)), math.log2(max(n for n, _ in points))
+        low, high = math.log10(min(value for _, value in points)), math.log10(max(value for _, value in points))
+        span_n, span = max(high_n - low_n, 1e-9), max(high - low, 1e-9)
+
+        def to_screen(n: float, value: float) -> tuple[int, int]:
+            x = rect.x + 4 + (math.log2(n) - low_n) / span_n * (rect.width - 8)
+            y = rect.bottom - 4 - (math.log10(value) - low) / span * (rect.height - 8)
+            return round(x), round(y)
+
+        previous_clip = screen.get_clip()
+        screen.set_clip(rect)
+        for i, (records, fit) in enumerate(series):
+            color = series_colors[i % len(series_colors)]
+            if fit is not None and records:
+                # The fit is drawn across the sizes of its own series
+                model, coefficient = MODELS[fit.model], fit.coefficient
+                first, last = math.log2(records[0]["n"]), math.log2(records[-1]["n"])
+                samples = [2 ** (first + (last - first) * step / 32) for step in range(33)]
+                curve = [to_screen(n, coefficient * model(n)) for n in samples if coefficient * model(n) > 0]
+                if len(curve) > 1:
+                    pygame.draw.lines(screen, color, False, curve)
+            for record in records:
+                value = self.value(record)
+                if record["n"] >= 2 and value > 0:
+                    pygame.draw.circle(screen, color, to_screen(record["n"], value), 3)
+        screen.set_clip(previous_clip)
+
+        draw_text(screen, font, colors.PRIMARY_COLOR, f"{10 ** high:.3g}", rect.x + 6, rect.y + 2)
+        draw_text(screen, font, colors.PRIMARY_COLOR, f"n = {min(n for n, _ in points)}", rect.x, rect.bottom + 4)
+        high_label = f"{max(n for n, _ in points)}"
+        draw_text(screen, font, colors.PRIMARY_COLOR, high_label, rect.right - font.size(high_label)[0], rect.bottom + 4)
+
+
+# Measures how the steps and time of an algorithm grow with the size of its input (see complexity.py) and plots them
+# The measurements run in a worker process and arrive one size at a time, so the page stays responsive,
+# the plots fill in as they arrive, and returning home cancels whatever is still being measured.
+# It is stepped like an algorithm where each step takes every measurement that has arrived
+class ComplexityAnalysis:
+    title = "Complexity Analysis"
+
+    # Size of each of the two plots, drawn side by side below the status line
+    plot_width = 330
+    plot_height = 200
+
+    def __init__(self, screen: pygame.Surface, algorithm: str, kinds: Sequence[str], exponents: Sequence[int],
+                 x: int, y: int) -> None:
+        """
+        Args:
+            screen (pygame.Surface): The pygame screen.
+            algorithm (str): The algorithm to measure, as labelled in runner.RUNNERS.
+            kinds (Sequence[str]): Kinds of input to measure on (see complexity.check_kinds).
+            exponents (Sequence[int]): The input sizes, as powers of two.
+            x (int): x-position of the plots.
+            y (int): y-position the page is laid out around, the title is drawn 100 pixels above it.
+
+        Raises:
+            ValueError: If the algorithm or a kind is unknown, or the algorithm can not run on a kind.
+        """
+        check_kinds(algorithm, kinds)
+        self.screen = screen
+        self.algorithm = algorithm
+        self.kinds = list(kinds)
+        self.exponents = sorted(exponents)
+        self.x = x
+        self.y = y
+
+        # Records of every measurement so far, and the (model, coefficient) that fits each kind's steps and time best
+        self.records = []
+        self.fits = {}
+
+        self.plots = [
+            Plot("Steps", pygame.Rect(x, y + 30, self.plot_width, self.plot_height), lambda record: record["steps"]),
+            Plot("Seconds", pygame.Rect(x + self.plot_width + 40, y + 30, self.plot_width, self.plot_height),
+                 lambda record: record["seconds"])
+        ]
+        self.area = pygame.Rect(0, y - 60, screen.get_width(), self.plot_height + 208)
+
+        self.solved = False
+        self._changed = True
+        self.start = perf_counter()
+        self.elapsed = 0.0
+        self.worker = StepWorker(measure_growth, (algorithm, self.kinds, self.exponents, analysis_max_seconds),
+                                 use_process=True)
+
+    # The page has no array to zoom or scroll
+    cell_array_obj = None
+
+    @property
+    def step_count(self) -> int:
+        return len(self.records)
+
+    def is_step_ready(self) -> bool:
+        return self.worker.ready()
+
+    def next_step(self) -> None:
+        while not self.solved and self.worker.ready():
+            try:
+                self.records.append(next(self.worker))
+            except StopIteration:
+                self.solved = True
+            self._changed = True
+        self.elapsed = perf_counter() - self.start
+        if self._changed:
+            self._fit()
+
+    def previous_step(self) -> None:
+        pass
+
+    def seek(self, step: int) -> None:
+        pass
+
+    def close(self) -> None:
+        # A measurement can run for seconds without checking if it was cancelled, so its process is killed straight away
+        self.worker.close(timeout=0.05)
+
+    def _series(self, kind: str) -> list[dict[str, Any]]:
+        return [record for record in self.records if record["kind"] == kind and record["error"] is None]
+
+    def _fit(self) -> None:
+        # A model is only fitted once a kind has three sizes, fewer fit any model
+        for kind in self.kinds:
+            records = self._series(kind)
+            sizes = [record["n"] for record in records]
+            for plot in self.plots:
+                fits = fit_models(sizes, [plot.value(record) for record in records]) if len(records) >= 3 else []
+                self.fits[kind, plot.label] = fits[0] if fits else None
+
+    def describe(self) -> str:
+        runs = f"{self.algorithm} on {', '.join(self.kinds)}: {len(self.records)} runs"
+        if self.solved:
+            return f"{runs} in {self.elapsed:.1f}s"
+        if self.records:
+            last = self.records[-1]
+            return f"{runs}, measuring beyond n = {last['n']}"
+        return f"{runs}, measuring"
+
+    def _draw_results(self, screen: pygame.Surface) -> None:
+        draw_text(screen, font, colors.SELECTED_COLOR, self.describe(), self.x, self.y - 55)
+        for plot in self.plots:
+            series = [(self._series(kind), self.fits.get((kind, plot.label))) for kind in self.kinds]
+            plot.draw(screen, series)
+
+        # Legend of the best fit of each kind, in the kind's color, in columns of three
+        errors = sum(record["error"] is not None for record in self.records)
+        for i, kind in enumerate(self.kinds):
+            fits = [self.fits.get((kind, plot.label)) for plot in self.plots]
+            text = f"{kind}: " + ", ".join(f"{plot.label.lower()} {fit.model if fit else '...'}"
+                                            for plot, fit in zip(self.plots, fits))
+            column, row = divmod(i, 3)
+            draw_text(screen, font, series_colors[i % len(series_colors)], text,
+                      self.x + column * 370, self.y + self.plot_height + 70 + row * 26)
+        if errors:
+            draw_text(screen, font, colors.PRIMARY_COLOR, f"{errors} runs failed", self.x + 370, self.y + self.plot_height + 70)
+        self._changed = False
+
+    def draw(self, screen: pygame.Surface) -> None:
+        draw_text(screen, header, colors.SELECTED_COLOR, self.title, self.x, self.y - 100)
+        self._draw_results(screen)
+
+    def draw_dirty(self, screen: pygame.Surface) -> list[pygame.Rect]:
+        # Everything below the title is redrawn when a measurement arrives
+        if not self._changed:
+            return []
+        screen.fill(colors.BACKGROUND_COLOR, self.area)
+        self._draw_results(screen)
+        return [self.area]
+
+
+class ComplexityUI:
+    def __init__(self, screen: pygame.Surface) -> None:
+        self.input_boxes = [
+            InputBox(screen, f"Algorithm ({', '.join(RUNNERS)})", 50, 140, 240, 50),
+            InputBox(screen, "Inputs (e.g. random, sorted, reversed or grid, random)", 50, 240, 500, 50, 60),
+            InputBox(screen, "Sizes as powers of two (4-20 if empty)", 50, 340, 240, 50)
+        ]
+        self.buttons = [
+            Button(screen, "Submit", 50, 420, 125, 60, get_input_data(self.input_boxes))
+        ]
+
+
+def create_analysis(screen: pygame.Surface, algorithm: str, kinds: str, sizes: str, x: int, y: int) -> ComplexityAnalysis:
+    """Creates a ComplexityAnalysis from the text typed into the ComplexityUI.
+
+    Raises:
+        ValueError: If any of the text is invalid.
+    """
+    return ComplexityAnalysis(screen, algorithm.strip(), [kind.strip() for kind in kinds.split(",") if kind.strip()],
+                              parse_exponents(sizes), x, y)
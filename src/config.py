@@ -1,3 +1,4 @@
+import os
 import pygame
 from collections import namedtuple
 
@@ -5,10 +6,69 @@ from collections import namedtuple
 rect_size = 50
 border_size = 5
 
+# Maximum number of rendered text surfaces kept by the text cache
+text_cache_size = 512
+
+# Algorithm timeline, a snapshot is taken every keyframe interval steps and old steps are dropped past the memory cap
+# Snapshots of large arrays are taken further apart, so they take at most snapshot bytes per step for the steps after them
+timeline_keyframe_interval = 500
+timeline_snapshot_bytes_per_step = 1024
+timeline_max_bytes = 128 * 1024 * 1024
+
+# Steps between the keyframes of trace files (see traces.py), seeking a replay applies at most this many steps
+trace_chunk_steps = 4096
+
+# Arrays longer than the threshold are drawn as a bar chart instead of boxed cells
+bar_mode_threshold = 200
+bar_height = 300
+
+# Height of each of the two bar charts (the array and its auxiliary buffer) drawn by merge sort
+merge_bar_height = 140
+
+# The complexity analysis (see complexity.py) stops growing an input kind once one run of it took longer than this
+analysis_max_seconds = 2.0
+
+# Graphs without positions are laid out (see layout.py) with this many force-directed iterations, or in layers
+# if they have more than force max nodes, and the layouts are cached in the cache directory
+layout_iterations = 50
+layout_force_max_nodes = 1000
+layout_cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "algorithm-visualizer", "layouts")
+# Seconds between checks for a layout being computed in the background, while the window is otherwise idle
+layout_poll_interval = 0.1
+
+# Step workers (see workers.py) send steps in batches of up to batch size steps, sending a batch early once it has taken
+# the flush time to fill, and block once max batches are waiting to be taken
+step_worker_batch_size = 256
+step_worker_flush_ms = 10
+step_worker_max_batches = 64
+
+# Algorithm stepping speed (steps per second) and the longest time a frame may spend stepping
+default_steps_per_second = 2
+step_frame_budget_ms = 10
+
+# Font that is only loaded (initializing the font module if needed) the first time it is measured or rendered with,
+# so importing config does not read any font file
+class LazyFont:
+    def __init__(self, path: str, size: int) -> None:
+        self.path = path
+        self.size_points = size
+        self._font = None
+
+    def load(self) -> pygame.font.Font:
+        if self._font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            self._font = pygame.font.Font(self.path, self.size_points)
+        return self._font
+
+    def __getattr__(self, name: str):
+        # Everything else (render, size, get_height, ...) is the loaded font's
+        return getattr(self.load(), name)
+
+
 # Fonts
-pygame.font.init()
-header = pygame.font.Font("fonts/Roboto-Bold.ttf", 36)
-font = pygame.font.Font("fonts/Roboto-Regular.ttf", 22)
+header = LazyFont("fonts/Roboto-Bold.ttf", 36)
+font = LazyFont("fonts/Roboto-Regular.ttf", 22)
 
 # Colors
 Color = namedtuple("Colors", ["BACKGROUND_COLOR", "PRIMARY_COLOR", "INACTIVE_COLOR", "SELECTED_COLOR", "SOLUTION", "HOVER_COLOR", "ACTIVE_COLOR"])
@@ -20,4 +80,7 @@ colors = Color(
     SOLUTION = "#00FF00",
     HOVER_COLOR = "#454545",
     ACTIVE_COLOR = "#595959"
-)
\ No newline at end of file
+)
+
+# Colors of the series of a plot, one for each input kind
+series_colors = ("#ffffff", "#00FF00", "#4f9dff", "#ffb347", "#ff6b6b")
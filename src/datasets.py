@@ -0,0 +1,180 @@
+import ast
+import mmap
+import random
+import re
+import sys
+from array import array
+from typing import Optional, Sequence, Union
+
+
+# Kinds of input generate can make
+KINDS = ("random", "sorted", "reversed", "nearly_sorted", "few_unique")
+
+# memoryview formats of the integer dtypes .npy files can be mapped as
+NPY_FORMATS = {"i1": "b", "u1": "B", "i2": "h", "u2": "H", "i4": "i", "u4": "I", "i8": "q", "u8": "Q"}
+
+# Values are generated in chunks so no full size temporary list is ever built
+GENERATE_CHUNK = 1 << 16
+
+_separators = re.compile(rb"[\s,;]+")
+
+
+def load_text(path: str, chunk_size: int = 1 << 20) -> array:
+    """Stream-parses the integers of a text or CSV file (seperated by commas, semicolons or whitespace) into a typed array.
+
+    The file is read in chunks, so apart from the result only one chunk is held in memory at a time.
+
+    Args:
+        path (str): Path of the file.
+        chunk_size (int, optional): Number of bytes read at a time.
+
+    Raises:
+        ValueError: If the file contains anything other than integers.
+    """
+    values = array("q")
+    leftover = b""
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            tokens = _separators.split(leftover + chunk)
+
+            # The last token may continue in the next chunk
+            leftover = tokens.pop()
+            values.extend(int(token) for token in tokens if token)
+    if leftover.strip():
+        values.append(int(leftover))
+    return values
+
+
+def map_binary(path: str, typecode: str = "q") -> memoryview:
+    """Memory-maps a file of native integers without reading or copying it.
+
+    The mapping is copy-on-write, so sorting the values in place never changes the file and only copies the pages written to.
+
+    Args:
+        path (str): Path of the file.
+        typecode (str, optional): struct format of each integer, "q" for 64-bit.
+
+    Raises:
+        ValueError: If the file is empty or its length is not a whole number of integers.
+    """
+    with open(path, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+    item_size = array(typecode).itemsize
+    if len(mapped) % item_size:
+        raise ValueError(f"{path} is {len(mapped)} bytes, not a whole number of {item_size} byte integers")
+    return memoryview(mapped).cast(typecode)
+
+
+def load_npy(path: str) -> memoryview:
+    """Memory-maps the data of a one dimensional integer .npy file without reading or copying it.
+
+    Raises:
+        ValueError: If the file is not a little-endian, C-ordered, one dimensional integer array, or is cut short.
+    """
+    with open(path, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    if mapped[:6] != b"\x93NUMPY":
+        raise ValueError(f"{path} is not a .npy file")
+    major = mapped[6]
+    if major == 1:
+        header_length, header_start = int.from_bytes(mapped[8:10], "little"), 10
+    else:
+        header_length, header_start = int.from_bytes(mapped[8:12], "little"), 12
+    header = ast.literal_eval(mapped[header_start:header_start + header_length].decode("latin1"))
+
+    descr, shape = header["descr"], header["shape"]
+    byte_order, dtype = descr[0], descr[1:]
+    if dtype not in NPY_FORMATS or header["fortran_order"] or len(shape) != 1:
+        raise ValueError(f"{path} must hold a one dimensional integer array, not {descr} {shape}")
+    if byte_order not in "<|=" or sys.byteorder != "little":
+        raise ValueError(f"{path} must be little-endian")
+
+    data_start = header_start + header_length
+    data_length = shape[0] * int(dtype[1])
+    if len(mapped) - data_start < data_length:
+        raise ValueError(f"{path} is cut short, its shape {shape} needs {data_length} bytes of data")
+    return memoryview(mapped)[data_start:data_start + data_length].cast(NPY_FORMATS[dtype])
+
+
+def generate(kind: str, n: int, seed: Optional[int] = None) -> array:
+    """Generates n values of one of the KINDS of input.
+
+    Args:
+        kind (str): random, sorted, reversed, nearly_sorted (sorted with about 1% of neighbours swapped) or few_unique.
+        n (int): Number of values.
+        seed (Optional[int], optional): Seed of the random values, the same seed always gives the same values.
+
+    Raises:
+        ValueError: If the kind is unknown or n is negative.
+    """
+    if n < 0:
+        raise ValueError(f"Invalid number of values {n}, it can not be negative")
+    rng = random.Random(seed)
+
+    if kind == "sorted":
+        return array("q", range(n))
+    if kind == "reversed":
+        return array("q", range(n - 1, -1, -1))
+    if kind == "nearly_sorted":
+        values = array("q", range(n))
+        for _ in range(max(1, n // 100) if n > 1 else 0):
+            i = rng.randrange(n - 1)
+            values[i], values[i + 1] = values[i + 1], values[i]
+        return values
+    if kind in ("random", "few_unique"):
+        population = range(max(1, n)) if kind == "random" else range(min(8, max(1, n)))
+        values = array("q")
+        for start in range(0, n, GENERATE_CHUNK):
+            values.extend(rng.choices(population, k=min(GENERATE_CHUNK, n - start)))
+        return values
+    raise ValueError(f"Unknown input kind {kind}, expected one of {', '.join(KINDS)}")
+
+
+def is_dataset_spec(spec: str) -> bool:
+    spec = spec.strip()
+    return spec.startswith("@") or spec.split(":")[0] in KINDS
+
+
+def load_dataset(spec: str) -> Union[array, memoryview]:
+    """Loads the values described by a dataset spec.
+
+    Specs are either "@path" to load a file (.npy and .bin files are memory-mapped, anything else is parsed as text)
+    or "kind:n[:seed]" to generate n values of one of the KINDS, e.g. "random:100000:42".
+
+    Raises:
+        ValueError: If the spec or the file's contents are invalid.
+        OSError: If the file can not be read.
+    """
+    spec = spec.strip()
+    if spec.startswith("@"):
+        path = spec[1:]
+        if path.endswith(".npy"):
+            return load_npy(path)
+        if path.endswith(".bin"):
+            return map_binary(path)
+        return load_text(path)
+
+    parts = spec.split(":")
+    if len(parts) not in (2, 3):
+        raise ValueError(f"Invalid dataset spec {spec}")
+    seed = int(parts[2]) if len(parts) == 3 else None
+    return generate(parts[0], int(parts[1]), seed)
+
+
+def load_values(user_input: str) -> Union[array, memoryview]:
+    """Returns the values of either a comma seperated list of integers or a dataset spec (see load_dataset).
+
+    Raises:
+        ValueError: If the list, the spec or the file's contents are invalid.
+        OSError: If the file can not be read.
+    """
+    if is_dataset_spec(user_input):
+        return load_dataset(user_input)
+    return array("q", (int(value) for value in "".join(user_input.split()).split(",")))
+
+
+def write_binary(path: str, values: Sequence[int]) -> None:
+    """Writes values as native 64-bit integers, the format map_binary reads."""
+    with open(path, "wb") as file:
+        file.write(array("q", values).tobytes())
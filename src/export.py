@@ -0,0 +1,160 @@
+import os
+
+# Frames are rendered offscreen, so SDL must not open a window, and raw frames may go to stdout
+# so pygame must not print its banner there (both set before pygame is imported)
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import shlex
+import subprocess
+import sys
+import pygame
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from algorithms import BinarySearch, InsertionSort, MergeSort, StepAlgorithm
+from cell import CellArray
+from config import colors
+from array import array
+from steps import binary_search_steps, insertion_sort_steps, is_sorted, merge_sort_steps, run_steps
+from utils import parse_array
+
+
+# Describes what to export: (algorithm, values, value to find, width, height)
+ExportJob = tuple[str, tuple[int, ...], Optional[int], int, int]
+
+
+def create_algorithm(job: ExportJob, surface: pygame.Surface) -> StepAlgorithm:
+    algorithm, values, value, _, _ = job
+    cell_array = CellArray(surface, values)
+    if algorithm == "bsa":
+        return BinarySearch(cell_array, value, 50, 140)
+    if algorithm == "msa":
+        return MergeSort(cell_array, 50, 140)
+    return InsertionSort(cell_array, 50, 140)
+
+
+def count_frames(job: ExportJob) -> int:
+    # One frame for the starting state and one after every step, counted with the headless step engine
+    algorithm, values, value, _, _ = job
+    if algorithm == "bsa":
+        return run_steps(binary_search_steps(values, value)) + 1
+    if algorithm == "msa":
+        return run_steps(merge_sort_steps(array("q", values))) + 1
+    return run_steps(insertion_sort_steps(list(values))) + 1
+
+
+# Each worker process keeps its own algorithm between chunks, frame chunks are handed out in order
+# so a worker only ever seeks forward by the frames other workers rendered in between
+_worker_surface = None
+_worker_algorithm = None
+
+
+def _init_worker(job: ExportJob) -> None:
+    global _worker_surface, _worker_algorithm
+    pygame.display.init()
+    _worker_surface = pygame.Surface((job[3], job[4]))
+    _worker_algorithm = create_algorithm(job, _worker_surface)
+
+
+def render_frames(first: int, stop: int, out_dir: Optional[str]) -> list[bytes]:
+    """Renders the frames first..stop (half-open) in a worker process.
+
+    Args:
+        first (int): First frame to render.
+        stop (int): Frame to stop before.
+        out_dir (Optional[str]): Directory to save PNG frames in, when None the raw RGB bytes of each frame are returned instead.
+
+    Returns:
+        list[bytes]: The raw RGB frames, empty when saving PNGs.
+    """
+    frames = []
+    for frame in range(first, stop):
+        _worker_algorithm.seek(frame)
+        _worker_surface.fill(colors.BACKGROUND_COLOR)
+        _worker_algorithm.draw(_worker_surface)
+
+        if out_dir is None:
+            frames.append(pygame.image.tobytes(_worker_surface, "RGB"))
+        else:
+            pygame.image.save(_worker_surface, os.path.join(out_dir, f"frame_{frame:06d}.png"))
+    return frames
+
+
+def export(job: ExportJob, out_dir: Optional[str], stream, workers: int, chunk_size: int) -> int:
+    """Renders every frame of an algorithm run across a process pool.
+
+    Args:
+        job (ExportJob): What to export.
+        out_dir (Optional[str]): Directory to save PNG frames in, or None to write raw RGB frames to stream.
+        stream: Binary file raw frames are written to in order.
+        workers (int): Number of worker processes.
+        chunk_size (int): Number of frames rendered per task.
+
+    Returns:
+        int: The number of frames exported.
+    """
+    total = count_frames(job)
+    chunks = [(first, min(first + chunk_size, total)) for first in range(0, total, chunk_size)]
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(job,)) as executor:
+        # Only a few chunks are in flight at a time so raw frames waiting to be written stay bounded
+        pending = deque()
+        for first, stop in chunks:
+            pending.append(executor.submit(render_frames, first, stop, out_dir))
+            if len(pending) >= workers * 2:
+                _write_frames(pending.popleft().result(), stream)
+        while pending:
+            _write_frames(pending.popleft().result(), stream)
+
+    return total
+
+
+def _write_frames(frames: list[bytes], stream) -> None:
+    for frame in frames:
+        stream.write(frame)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export the frames of an algorithm run without opening a window")
+    parser.add_argument("algorithm", choices=["bsa", "isa", "msa"], help="bsa (binary search), isa (insertion sort) or msa (merge sort)")
+    parser.add_argument("array", help="array to run the algorithm on, seperated by commas")
+    parser.add_argument("--value", type=int, help="value to find (binary search only)")
+    parser.add_argument("--format", choices=["png", "raw"], default="png", help="PNG sequence or a raw RGB24 stream")
+    parser.add_argument("--out", default="frames", help="directory for PNG frames")
+    parser.add_argument("--encoder", help="command raw frames are piped to, e.g. \"ffmpeg -f rawvideo -pix_fmt rgb24 -s 800x600 -r 30 -i - out.mp4\" (default: stdout)")
+    parser.add_argument("--size", default="800x600", help="frame size as WIDTHxHEIGHT")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--chunk-size", type=int, default=50, help="number of frames per task")
+    args = parser.parse_args()
+
+    if args.algorithm == "bsa" and args.value is None:
+        parser.error("--value is required for bsa")
+    try:
+        values = parse_array(args.array)
+    except ValueError:
+        parser.error("invalid array")
+    # Checked here as the workers create the algorithm, where an error would only break the pool
+    if args.algorithm == "bsa" and not is_sorted(values):
+        parser.error("binary search needs the array to be sorted")
+    width, height = map(int, args.size.lower().split("x"))
+    job = (args.algorithm, tuple(values), args.value, width, height)
+
+    if args.format == "png":
+        os.makedirs(args.out, exist_ok=True)
+        total = export(job, args.out, None, args.workers, args.chunk_size)
+    elif args.encoder:
+        encoder = subprocess.Popen(shlex.split(args.encoder), stdin=subprocess.PIPE)
+        total = export(job, None, encoder.stdin, args.workers, args.chunk_size)
+        encoder.stdin.close()
+        encoder.wait()
+    else:
+        total = export(job, None, sys.stdout.buffer, args.workers, args.chunk_size)
+
+    print(f"Exported {total} frames", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
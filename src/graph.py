@@ -0,0 +1,180 @@
+import math
+import random
+import re
+from array import array
+from bisect import bisect_right
+from typing import Optional
+
+
+# Weighted graph in compressed sparse row (CSR) form
+# The edges leaving node u are the indices offsets[u]..offsets[u + 1] (half-open) of targets and weights,
+# so the whole graph is three typed arrays however many edges it has
+class Graph:
+    def __init__(self, offsets: array, targets: array, weights: array, positions: Optional[array] = None) -> None:
+        """
+        Args:
+            offsets (array): Index of the first edge of every node, followed by the number of edges.
+            targets (array): Node each edge leads to.
+            weights (array): Weight of each edge.
+            positions (Optional[array], optional): x, y pairs (between 0 and 1) of every node for drawing.
+        """
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.positions = positions
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.targets)
+
+    def edges(self, node: int) -> range:
+        return range(self.offsets[node], self.offsets[node + 1])
+
+    def edge_source(self, edge: int) -> int:
+        return bisect_right(self.offsets, edge) - 1
+
+    @classmethod
+    def from_edges(cls, num_nodes: int, sources: array, targets: array, weights: array, directed: bool = False,
+                   positions: Optional[array] = None) -> "Graph":
+        """Builds a graph from parallel arrays of edge sources, targets and weights with a counting sort.
+
+        Raises:
+            ValueError: If an edge refers to a node outside 0..num_nodes-1.
+        """
+        if sources and (min(min(sources), min(targets)) < 0 or max(max(sources), max(targets)) >= num_nodes):
+            raise ValueError(f"Edges must be between nodes 0 and {num_nodes - 1}")
+
+        # Undirected edges are stored once in each direction
+        if not directed:
+            sources, targets, weights = sources + targets, targets + sources, weights + weights
+
+        offsets = array("q", [0]) * (num_nodes + 1)
+        for source in sources:
+            offsets[source + 1] += 1
+        for node in range(num_nodes):
+            offsets[node + 1] += offsets[node]
+
+        sorted_targets = array("q", [0]) * len(targets)
+        sorted_weights = array("q", [0]) * len(weights)
+        next_edge = offsets[:-1]
+        for i, source in enumerate(sources):
+            edge = next_edge[source]
+            sorted_targets[edge] = targets[i]
+            sorted_weights[edge] = weights[i]
+            next_edge[source] = edge + 1
+        return cls(offsets, sorted_targets, sorted_weights, positions)
+
+
+_separators = re.compile(r"[\s,;]+")
+
+
+def load_edge_list(path: str, directed: bool = False) -> Graph:
+    """Loads a graph from a text file with one "source target [weight]" edge per line, lines starting with # are skipped.
+
+    Nodes are numbered from 0 and edges without a weight weigh 1.
+
+    Raises:
+        ValueError: If a line is not an edge.
+    """
+    sources, targets, weights = array("q"), array("q"), array("q")
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = _separators.split(line)
+            if len(fields) not in (2, 3):
+                raise ValueError(f"Invalid edge {line}")
+            sources.append(int(fields[0]))
+            targets.append(int(fields[1]))
+            weights.append(int(fields[2]) if len(fields) == 3 else 1)
+
+    num_nodes = max(max(sources), max(targets)) + 1 if sources else 0
+    return Graph.from_edges(num_nodes, sources, targets, weights, directed)
+
+
+def grid_graph(width: int, height: int, seed: Optional[int] = None) -> Graph:
+    """Generates a width by height grid where every node is joined to its right and lower neighbour by an edge of weight 1 to 9."""
+    rng = random.Random(seed)
+    sources, targets = array("q"), array("q")
+    positions = array("d")
+    for y in range(height):
+        for x in range(width):
+            node = y * width + x
+            positions.extend((x / max(1, width - 1), y / max(1, height - 1)))
+            if x + 1 < width:
+                sources.append(node)
+                targets.append(node + 1)
+            if y + 1 < height:
+                sources.append(node)
+                targets.append(node + width)
+    weights = array("q", (rng.randint(1, 9) for _ in range(len(sources))))
+    return Graph.from_edges(width * height, sources, targets, weights, positions=positions)
+
+
+def random_graph(num_nodes: int, num_edges: int, seed: Optional[int] = None) -> Graph:
+    """Generates a connected graph of randomly placed nodes, where edges join nodes that are close together
+    and weigh their length.
+
+    Nodes are scattered around the points of a square grid (numbered row by row), every row is a chain and the first
+    column joins the rows so the graph is connected, and the remaining edges join random nodes to a node up to two
+    rows and columns away.
+    """
+    rng = random.Random(seed)
+    columns = max(1, math.ceil(math.sqrt(num_nodes)))
+    rows = math.ceil(num_nodes / columns)
+    positions = array("d")
+    for node in range(num_nodes):
+        row, column = divmod(node, columns)
+        positions.extend(((column + rng.random() * 0.8) / columns, (row + rng.random() * 0.8) / max(1, rows)))
+
+    sources, targets = array("q"), array("q")
+    for node in range(num_nodes):
+        if (node + 1) % columns and node + 1 < num_nodes:
+            sources.append(node)
+            targets.append(node + 1)
+        if node % columns == 0 and node + columns < num_nodes:
+            sources.append(node)
+            targets.append(node + columns)
+
+    for _ in range(max(0, num_edges - len(sources))):
+        source = rng.randrange(num_nodes)
+        row, column = divmod(source, columns)
+        row, column = row + rng.randint(-2, 2), column + rng.randint(-2, 2)
+        target = row * columns + column
+        if 0 <= row and 0 <= column < columns and target < num_nodes and target != source:
+            sources.append(source)
+            targets.append(target)
+
+    weights = array("q", (
+        1 + int(1000 * math.dist(positions[2 * s:2 * s + 2], positions[2 * t:2 * t + 2]))
+        for s, t in zip(sources, targets)
+    ))
+    return Graph.from_edges(num_nodes, sources, targets, weights, positions=positions)
+
+
+def load_graph(spec: str) -> Graph:
+    """Loads the graph described by a graph spec.
+
+    Specs are either "@path" to load an edge list file (see load_edge_list), "grid:WxH[:seed]" to generate a grid
+    or "random:n:m[:seed]" to generate a random graph of n nodes and about m edges.
+
+    Raises:
+        ValueError: If the spec or the file's contents are invalid.
+        OSError: If the file can not be read.
+    """
+    spec = spec.strip()
+    if spec.startswith("@"):
+        return load_edge_list(spec[1:])
+
+    parts = spec.split(":")
+    if parts[0] == "grid" and len(parts) in (2, 3):
+        width, height = map(int, parts[1].lower().split("x"))
+        return grid_graph(width, height, int(parts[2]) if len(parts) == 3 else None)
+    if parts[0] == "random" and len(parts) in (3, 4):
+        return random_graph(int(parts[1]), int(parts[2]), int(parts[3]) if len(parts) == 4 else None)
+    raise ValueError(f"Invalid graph spec {spec}")
@@ -0,0 +1,112 @@
+import pygame
+from array import array
+
+from config import Color, colors, layout_cache_dir, layout_force_max_nodes, layout_iterations
+from graph import Graph
+from layout import layered_layout, layout_steps, read_cached_layout
+from workers import StepWorker
+
+
+# Draws a Graph inside a rectangle of the screen
+# Every edge and node is drawn once onto a base surface in its unvisited colors, drawing the graph blits the base
+# and only the nodes and edges an algorithm changed are drawn on top of it, from pixel positions computed once
+# (again if the layout changes)
+class GraphRenderer:
+    def __init__(self, graph: Graph, rect: pygame.Rect) -> None:
+        self.graph = graph
+        self.rect = rect
+
+        # Smaller nodes for larger graphs so they do not cover each other
+        n = graph.num_nodes
+        self.radius = 6 if n <= 200 else 3 if n <= 5000 else 1
+
+        # Graphs without positions are laid out, which is cached so the same graph opens straight away the next time
+        # A layout that is not cached takes seconds for large graphs, so the graph is shown in layers straight away
+        # while a worker process lays it out, and is redrawn once update_layout takes the finished layout
+        self._layout_worker = None
+        positions = graph.positions
+        if positions is None and graph.num_nodes <= layout_force_max_nodes:
+            positions = read_cached_layout(graph, layout_cache_dir, layout_iterations)
+            if positions is None:
+                self._layout_worker = StepWorker(layout_steps, (graph, layout_cache_dir, layout_iterations,
+                                                                layout_force_max_nodes), use_process=True)
+        if positions is None:
+            positions = layered_layout(graph)
+        self._place(positions)
+
+    @property
+    def layout_pending(self) -> bool:
+        return self._layout_worker is not None
+
+    def _place(self, positions: array) -> None:
+        # Pixel position of every node on the screen
+        rect, n = self.rect, self.graph.num_nodes
+        margin = self.radius + 1
+        width, height = max(1, rect.width - 2 * margin), max(1, rect.height - 2 * margin)
+        self.points = [
+            (rect.x + margin + round(positions[2 * node] * width), rect.y + margin + round(positions[2 * node + 1] * height))
+            for node in range(n)
+        ]
+
+        # End points of every edge, undirected edges (stored in both directions) only once
+        offsets, targets = self.graph.offsets, self.graph.targets
+        joined = set()
+        self.segments = []
+        for u in range(n):
+            for e in range(offsets[u], offsets[u + 1]):
+                v = targets[e]
+                if (v, u) not in joined:
+                    joined.add((u, v))
+                    self.segments.append((self.points[u], self.points[v]))
+
+        self.base = None
+
+    def update_layout(self) -> bool:
+        """Takes the layout of the worker once it has finished, returning True if the graph moved and must be redrawn."""
+        if self._layout_worker is None or not self._layout_worker.ready():
+            return False
+        try:
+            positions = next(self._layout_worker)
+        except (StopIteration, ValueError, OSError) as error:
+            # The graph stays in layers
+            print(f"Could not lay out the graph: {error!r}")
+            positions = None
+        self.close()
+        if positions is None:
+            return False
+        self._place(positions)
+        return True
+
+    def close(self) -> None:
+        # Stops laying out the graph if it has not finished
+        if self._layout_worker is not None:
+            self._layout_worker.close(timeout=0.05)
+            self._layout_worker = None
+
+    def _draw_base(self) -> None:
+        self.base = pygame.Surface(self.rect.size)
+        self.base.fill(colors.BACKGROUND_COLOR)
+        offset_x, offset_y = self.rect.topleft
+        points = [(x - offset_x, y - offset_y) for x, y in self.points]
+
+        for (x1, y1), (x2, y2) in self.segments:
+            pygame.draw.line(self.base, colors.INACTIVE_COLOR, (x1 - offset_x, y1 - offset_y), (x2 - offset_x, y2 - offset_y))
+        for point in points:
+            self._draw_point(self.base, point, colors.ACTIVE_COLOR)
+
+    def _draw_point(self, surface: pygame.Surface, point: tuple[int, int], color: Color) -> pygame.Rect:
+        if self.radius == 1:
+            return surface.fill(color, (point[0], point[1], 1, 1))
+        return pygame.draw.circle(surface, color, point, self.radius)
+
+    def draw(self, screen: pygame.Surface) -> pygame.Rect:
+        """Draws the graph in its unvisited colors, returning the area drawn over."""
+        if self.base is None:
+            self._draw_base()
+        return screen.blit(self.base, self.rect)
+
+    def draw_node(self, screen: pygame.Surface, node: int, color: Color) -> pygame.Rect:
+        return self._draw_point(screen, self.points[node], color)
+
+    def draw_edge(self, screen: pygame.Surface, u: int, v: int, color: Color) -> pygame.Rect:
+        return pygame.draw.line(screen, color, self.points[u], self.points[v])
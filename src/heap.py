@@ -0,0 +1,111 @@
+from array import array
+from typing import Callable, Optional
+
+
+# Indexed binary min-heap of the nodes 0..capacity-1, each with an integer key
+# The heap is stored in preallocated typed arrays, position maps every node to its index in the heap (-1 when absent)
+# so a node's key can be decreased in place in O(log n) instead of pushing duplicates
+class MinHeap:
+    def __init__(self, capacity: int) -> None:
+        self.heap = array("q", [0]) * capacity
+        self.position = array("q", [-1]) * capacity
+        self.keys = array("q", [0]) * capacity
+        self.size = 0
+
+        # Called with (index, node) whenever a node is written to an index of the heap, e.g. to draw the heap
+        self.on_write: Optional[Callable[[int, int], None]] = None
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, node: int) -> bool:
+        return self.position[node] != -1
+
+    def key(self, node: int) -> int:
+        # The last key of a node, which is kept after it is popped
+        return self.keys[node]
+
+    def peek(self) -> tuple[int, int]:
+        if not self.size:
+            raise IndexError("peek at an empty heap")
+        node = self.heap[0]
+        return node, self.keys[node]
+
+    def push(self, node: int, key: int) -> None:
+        if self.position[node] != -1:
+            raise ValueError(f"Node {node} is already in the heap")
+        self.keys[node] = key
+        self.size += 1
+        self._sift_up(self.size - 1, node)
+
+    def decrease_key(self, node: int, key: int) -> None:
+        index = self.position[node]
+        if index == -1:
+            raise KeyError(node)
+        if key > self.keys[node]:
+            raise ValueError(f"Key {key} is larger than the current key of node {node}")
+        self.keys[node] = key
+        self._sift_up(index, node)
+
+    def push_or_decrease(self, node: int, key: int) -> None:
+        """Pushes a node, or lowers its key if it is already in the heap and key is smaller."""
+        if self.position[node] == -1:
+            self.push(node, key)
+        elif key < self.keys[node]:
+            self.decrease_key(node, key)
+
+    def pop(self) -> tuple[int, int]:
+        """Removes and returns the (node, key) with the smallest key."""
+        if not self.size:
+            raise IndexError("pop from an empty heap")
+        node = self.heap[0]
+        self.position[node] = -1
+        self.size -= 1
+        if self.size:
+            self._sift_down(0, self.heap[self.size])
+        return node, self.keys[node]
+
+    def _write(self, index: int, node: int) -> None:
+        self.heap[index] = node
+        self.position[node] = index
+        if self.on_write:
+            self.on_write(index, node)
+
+    def _sift_up(self, index: int, node: int) -> None:
+        # Parents with larger keys are moved down into the hole until node's place is found
+        keys, heap = self.keys, self.heap
+        key = keys[node]
+        while index > 0:
+            parent = (index - 1) >> 1
+            parent_node = heap[parent]
+            if keys[parent_node] <= key:
+                break
+            self._write(index, parent_node)
+            index = parent
+        self._write(index, node)
+
+    def _sift_down(self, index: int, node: int) -> None:
+        # The smaller child is moved up into the hole until node's place is found
+        keys, heap, size = self.keys, self.heap, self.size
+        key = keys[node]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and keys[heap[child + 1]] < keys[heap[child]]:
+                child += 1
+            child_node = heap[child]
+            if keys[child_node] >= key:
+                break
+            self._write(index, child_node)
+            index = child
+        self._write(index, node)
+
+    def snapshot(self) -> tuple:
+        return bytes(self.heap), bytes(self.position), bytes(self.keys), self.size
+
+    def restore(self, snapshot: tuple) -> None:
+        heap, position, keys, self.size = snapshot
+        memoryview(self.heap).cast("B")[:] = heap
+        memoryview(self.position).cast("B")[:] = position
+        memoryview(self.keys).cast("B")[:] = keys
@@ -0,0 +1,46 @@
+import pygame
+from typing import Callable, Hashable
+
+from config import colors
+
+
+# A full-screen surface of static content that is drawn once and then composited every frame
+# The layer is redrawn only when its key (e.g. the labels and positions of the widgets on it) changes or it is invalidated
+class Layer:
+    def __init__(self, size: tuple[int, int], draw: Callable[[pygame.Surface], None], key: Callable[[], Hashable] = lambda: None) -> None:
+        """
+        Args:
+            size (tuple[int, int]): Size of the layer, usually the screen's.
+            draw (Callable[[pygame.Surface], None]): Draws the static content onto the layer's surface.
+            key (Callable[[], Hashable], optional): Returns a value that changes whenever the static content does.
+        """
+        self.size = size
+        self.draw = draw
+        self.key = key
+
+        self.surface = None
+        self._drawn_key = None
+
+        # Number of times the layer was drawn, to check it is only redrawn when its content changes
+        self.builds = 0
+
+    def invalidate(self) -> None:
+        self.surface = None
+
+    def get_surface(self) -> pygame.Surface:
+        """Returns the layer's surface, redrawing it first if its content changed."""
+        key = self.key()
+        if self.surface is None or key != self._drawn_key:
+            self.surface = pygame.Surface(self.size).convert()
+            self.surface.fill(colors.BACKGROUND_COLOR)
+            self.draw(self.surface)
+            self._drawn_key = key
+            self.builds += 1
+        return self.surface
+
+    def blit(self, screen: pygame.Surface, area: pygame.Rect = None) -> pygame.Rect:
+        """Composites the whole layer, or only one area of it, onto the screen, returning the area drawn over."""
+        surface = self.get_surface()
+        if area is None:
+            return screen.blit(surface, (0, 0))
+        return screen.blit(surface, area, area)
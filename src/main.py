@@ -1,19 +1,37 @@
+from time import perf_counter
+
+# Read before anything else is imported, startup is timed from here to the first frame
+STARTED = perf_counter()
+
+import argparse
+import json
+import math
 import pygame
-from typing import Any
+from typing import Optional
 
-from algorithms import BinarySearch, BinarySearchUI, InsertionSort, InsertionSortUI
-from config import colors, header
-from widgets import Button, draw_text, draw_centered_text
-from utils import cell_array_init
+from config import colors, header, font, default_steps_per_second, layout_poll_interval, step_frame_budget_ms
+from profiler import FrameProfiler, LoopStats, StartupTimer
+from registry import ALGORITHMS, create_algorithm, create_ui
+from scheduler import StepScheduler
+from layers import Layer
+from widgets import Button, ButtonState, draw_text, draw_centered_text
+import workers
 
+# Algorithms (and their UIs) are only imported once chosen, see registry.py
+startup = StartupTimer(STARTED)
+startup.mark("imports")
 
-# pygame setup
-pygame.init()
+# pygame setup, only the display (which brings events, keys and the mouse) is initialized,
+# fonts are initialized the first time text is drawn and nothing else is used
+pygame.display.init()
 pygame.display.set_caption("Kevin's Algorithm Visualizer")
 
 # Screen settings
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
+FPS = 60
+# Time (in seconds) left unused at the end of every frame, as stepping only checks the clock every few steps
+FRAME_MARGIN = 0.002
 
 CTR_X = SCREEN_WIDTH / 2
 CTR_Y = SCREEN_HEIGHT / 2
@@ -21,17 +39,50 @@ CTR_Y = SCREEN_HEIGHT / 2
 # pygame Handlers
 screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 clock = pygame.time.Clock()
+startup.mark("display")
 
 
 class AlgorithmVisualizer:
-    def __init__(self) -> None:
+    def __init__(self, render_mode: str = "dirty", profile_csv: str = None, counters_out: str = None, idle: bool = True,
+                 print_loop_stats: bool = False, replay: str = None, print_startup: bool = False) -> None:
         self.current_algorithm_obj = None
-        self.time = pygame.time.get_ticks()
-        self.interval = 500 # Interval (in ms) between each algorithm step
+        self.scheduler = StepScheduler(default_steps_per_second, step_frame_budget_ms / 1000) # Decides how many steps to run each frame
         self.running = True # Toggles if the game loop is running
         self.state = "home"
         self.algorithm_chosen = None
 
+        # "dirty" only repaints the areas that changed each frame, "full" redraws the whole screen every frame
+        self.render_mode = render_mode
+        self.redraw_all = True
+        self._full_redraw_requested = True
+        self.dirty_rects = []
+
+        # Stepping may use whatever is left of a frame once the rest of it (measured on the previous frame) is done,
+        # so fast speeds are not held back by the frame budget while the frame rate holds
+        self._frame_deadline = None
+        self._step_time = 0.0
+        self._frame_work = 0.0
+
+        # Only exists while the profiler HUD is shown or frame timings are being written to a CSV file,
+        # so profiling costs nothing but a None check otherwise
+        self.profiler = FrameProfiler(csv_path=profile_csv) if profile_csv else None
+
+        # When idle is set and nothing is animating, the loop sleeps until input arrives or the next step is due
+        # instead of rendering unchanged frames, the loop statistics are printed on exit if print_loop_stats is set
+        self.idle = idle
+        self.loop_stats = LoopStats()
+        self.print_loop_stats = print_loop_stats
+
+        # Startup times are printed once the first frame is on screen, then the visualizer exits if print_startup is set
+        self.print_startup = print_startup
+
+        # Operation counts are printed when an algorithm finishes, and appended to this JSON lines file if set
+        self.counters_out = counters_out
+        self._counters_exported = False
+
+        # Text of each status line (by y-position) when it was last drawn
+        self._drawn_status = {}
+
         # Each algorithm may or may not have a different UI, therefore store them arbitrarily in a list
         self.input_boxes = []
         self.buttons = []
@@ -42,31 +93,136 @@ class AlgorithmVisualizer:
         padding = 20
         spacing = btn_height + padding
         self.home_buttons = [
-            {"label": "bsa", "obj": Button(screen, "Binary Search Algorithm", 50, starting_x, 260, 60, (lambda: None))},
-            {"label": "isa", "obj": Button(screen, "Insertion Sort Algorithm", 50, starting_x + spacing, 260, 60, (lambda: None))}
+            {"label": entry.label, "obj": Button(screen, entry.title, 50, starting_x + spacing * i, 260, 60, (lambda: None))}
+            for i, entry in enumerate(ALGORITHMS.values())
         ]
 
         self.back_button = Button(screen, "Return to home", 50, SCREEN_HEIGHT - 100, 200, 60, lambda: None)
 
+        # A trace file (see traces.py) to replay opens straight onto the algorithm page
+        if replay:
+            from traces import TraceReplay
+            self.current_algorithm_obj = TraceReplay(screen, replay, 50, 140)
+            self.state = "algorithm"
+
+        # Headers, labels and idle buttons never change while a page is shown, so they are drawn once onto a layer
+        # that is composited on full redraws, and idle buttons are restored from it instead of being drawn again
+        self.static_layers = {
+            "home": Layer(screen.get_size(), self.draw_home_static,
+                          lambda: tuple(button["obj"].static_key() for button in self.home_buttons)),
+            "input": Layer(screen.get_size(), self.draw_input_static,
+                           lambda: tuple(widget.static_key() for widget in self.input_boxes + self.buttons))
+        }
+
     def initialize_ui_elements(self):
-        # Depending on what algorithm is chosen initialize different UI elements
-        if self.algorithm_chosen == "bsa":
-            binary_search_ui = BinarySearchUI(screen)
-            self.input_boxes = binary_search_ui.input_boxes
-            self.buttons = binary_search_ui.buttons
-        elif self.algorithm_chosen == "isa":
-            insertion_sort_ui = InsertionSortUI(screen)
-            self.input_boxes = insertion_sort_ui.input_boxes
-            self.buttons = insertion_sort_ui.buttons
+        # Each algorithm has its own UI elements, imported the first time it is chosen
+        ui = create_ui(self.algorithm_chosen, screen)
+        self.input_boxes = ui.input_boxes
+        self.buttons = ui.buttons
+
+    def request_full_redraw(self) -> None:
+        # Repaints the whole screen on the next frame (e.g. after the page changes)
+        self._full_redraw_requested = True
+
+    def draw_widget(self, widget, *args, layer: Layer = None) -> None:
+        """Draws a widget if the whole screen is being redrawn or the widget changed, recording the area drawn over.
+
+        Args:
+            widget: Any widget with a draw and is_dirty function.
+            layer (Layer, optional): Static layer the widget is baked into while idle, it is copied from there instead of drawn.
+        """
+        if not (self.redraw_all or widget.is_dirty()):
+            return
+        if layer is not None and widget.get_visual_state() == ButtonState.IDLE:
+            # A full redraw already composited the layer
+            if not self.redraw_all:
+                self.dirty_rects.append(layer.blit(screen, widget.get_rect()))
+            widget.mark_drawn(ButtonState.IDLE)
+        else:
+            self.dirty_rects.append(widget.draw(*args))
+
+    def draw_home_static(self, surface: pygame.Surface) -> None:
+        draw_centered_text(surface, header, colors.SELECTED_COLOR, "Algorithm Visualizer", CTR_X, 50)
+        for button in self.home_buttons:
+            button["obj"].draw(surface, ButtonState.IDLE)
+
+    def draw_input_static(self, surface: pygame.Surface) -> None:
+        draw_text(surface, header, colors.SELECTED_COLOR, "Enter algorithm arguments", 50, 30)
+        for input_box in self.input_boxes:
+            input_box.draw_label(surface)
+        for button in self.buttons:
+            button.draw(surface, ButtonState.IDLE)
     
+    def toggle_profiler_hud(self) -> None:
+        if self.profiler is None:
+            self.profiler = FrameProfiler()
+        self.profiler.show_hud = not self.profiler.show_hud
+        if not self.profiler.show_hud and not self.profiler.is_recording():
+            self.profiler = None
+
+        # Repaint everything so the HUD is erased when hidden
+        self.request_full_redraw()
+
+    def idle_timeout(self) -> Optional[float]:
+        """Returns how long (in seconds) the loop may sleep before the next frame, 0 if a frame is needed now
+        and None if it may sleep until input arrives."""
+        if not self.idle or self._full_redraw_requested or (self.profiler and self.profiler.show_hud):
+            return 0.0
+        if self.state == "input":
+            # The cursor of a focused input box blinks
+            for input_box in self.input_boxes:
+                if input_box.is_focused:
+                    return input_box.textinput.cursor_blink_interval / 1000
+        elif self.state == "algorithm" and self.current_algorithm_obj:
+            due = None if self.current_algorithm_obj.solved else self.scheduler.time_until_due(perf_counter())
+            # A graph being laid out in the background is checked for its layout a few times a second
+            if getattr(self.current_algorithm_obj, "layout_pending", False):
+                due = layout_poll_interval if due is None else min(due, layout_poll_interval)
+            return due
+        return None
+
+    def wait_while_idle(self) -> list[pygame.event.Event]:
+        """Blocks while nothing is animating until an event arrives or the idle timeout passes, returning the event waited for."""
+        timeout = self.idle_timeout()
+        if timeout == 0:
+            return []
+
+        start = perf_counter()
+        event = pygame.event.wait() if timeout is None else pygame.event.wait(max(1, math.ceil(timeout * 1000)))
+        self.loop_stats.add_idle(perf_counter() - start)
+        return [] if event.type == pygame.NOEVENT else [event]
+
     def run(self) -> None:
         while self.running:
-            screen.fill(colors.BACKGROUND_COLOR)
-            events = pygame.event.get()
+            waited_events = self.wait_while_idle()
+            frame_start = perf_counter()
+            self._frame_deadline = frame_start + 1 / FPS - self._frame_work - FRAME_MARGIN
+            self._step_time = 0.0
+
+            profiler = self.profiler
+            if profiler:
+                profiler.begin_frame()
+
+            self.redraw_all = self.render_mode == "full" or self._full_redraw_requested
+            self._full_redraw_requested = False
+            self.dirty_rects = []
+            if self.redraw_all:
+                layer = self.static_layers.get(self.state)
+                if layer is not None:
+                    layer.blit(screen)
+                else:
+                    screen.fill(colors.BACKGROUND_COLOR)
+
+            events = waited_events + pygame.event.get()
             for event in events:
                 # Allows the window to be closed on QUIT ("X" at top right of the window)
                 if event.type == pygame.QUIT:
                     self.running = False
+                # F3 toggles the profiler HUD
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    self.toggle_profiler_hud()
+            if profiler:
+                profiler.mark("events")
 
             if self.state == "home":
                 self.home_page(events)
@@ -75,20 +231,46 @@ class AlgorithmVisualizer:
             elif self.state == "algorithm":
                 self.algorithm_page(events)
 
-            # Displays contents onto screen
-            pygame.display.update()
+            if profiler:
+                profiler.mark("page")
+                if profiler.show_hud:
+                    self.dirty_rects.append(profiler.draw_hud(screen))
+                    profiler.mark("hud")
 
-            # Sets the FPS of the window to 60
-            clock.tick(60)
+            # Displays contents onto screen, only pushing the changed areas unless everything was redrawn
+            if self.redraw_all:
+                pygame.display.update()
+            else:
+                pygame.display.update(self.dirty_rects)
+            if profiler:
+                profiler.mark("update")
+            self._frame_work = perf_counter() - frame_start - self._step_time
+            if self.loop_stats.frames == 0:
+                self.report_startup()
 
+            # Sets the FPS of the window
+            clock.tick(FPS)
+            self.loop_stats.add_frame()
+            if profiler:
+                profiler.end_frame()
+
+        self.close_algorithm()
+        if self.profiler:
+            self.profiler.close()
+        if self.print_loop_stats:
+            print(json.dumps(self.loop_stats.summary()))
         pygame.quit()
     
-    def home_page(self, events):
-        draw_centered_text(screen, header, colors.SELECTED_COLOR, "Algorithm Visualizer", CTR_X, 50)
+    def report_startup(self) -> None:
+        startup.mark("first_frame")
+        if self.print_startup:
+            print(json.dumps(startup.summary()))
+            self.running = False
 
-        # Home page contains buttons to select an algorithm
+    def home_page(self, events):
+        # Home page contains buttons to select an algorithm, the header is part of its static layer
         for button in self.home_buttons:
-            button["obj"].draw()
+            self.draw_widget(button["obj"], layer=self.static_layers["home"])
 
         for event in events:
             if event.type == pygame.MOUSEBUTTONDOWN:
@@ -98,23 +280,25 @@ class AlgorithmVisualizer:
                         # Set the algorithm and change the program state to the algorithm argument input section
                         self.algorithm_chosen = button["label"]
                         self.state = "input"
+                        self.request_full_redraw()
     
     _ui_variables_bounded = False
     def input_page(self, events):
-        draw_text(screen, header, colors.SELECTED_COLOR, "Enter algorithm arguments", 50, 30)
-
         # Only initialize the ui element variables one time
         if not self._ui_variables_bounded:
             self.initialize_ui_elements()
             self._ui_variables_bounded = True
+            self.request_full_redraw()
             return
 
         # Render the UI elements
         for button in self.buttons:
-            button.draw()
+            self.draw_widget(button, layer=self.static_layers["input"])
 
         for input_box in self.input_boxes:
-            input_box.draw(events)
+            # Labels are part of the static layer so only the box itself is drawn
+            if self.redraw_all or input_box.is_dirty():
+                self.dirty_rects.append(input_box.draw_box(events))
 
         # UI elements typically have the same functionality, however logic changes on buttons on_click functions
         for event in events:
@@ -122,45 +306,178 @@ class AlgorithmVisualizer:
                 mouse_x, mouse_y = pygame.mouse.get_pos()
                 for button in self.buttons:
                     if button.is_mouse_over(mouse_x, mouse_y):
-                        match self.algorithm_chosen:
-                            case "bsa":
-                                user_input, val = button.on_click()
-                                print(user_input)
-                                cell_array = cell_array_init(screen, user_input)
-                                self.current_algorithm_obj = BinarySearch(cell_array, int(val), 50, 140)
-                            case "isa":
-                                user_input = button.on_click()[0]
-                                cell_array = cell_array_init(screen, user_input)
-                                self.current_algorithm_obj = InsertionSort(cell_array, 50, 140)
+                        # The typed text is turned into the algorithm by the function registered for it
+                        try:
+                            self.current_algorithm_obj = create_algorithm(self.algorithm_chosen, screen, button.on_click(), 50, 140)
+                        except ValueError as error:
+                            print(error)
+                            self.current_algorithm_obj = None
                         self.state = "algorithm"
+                        self.scheduler.reset()
+                        self._counters_exported = False
+                        self.request_full_redraw()
 
                 for input_box in self.input_boxes:
                     input_box.handle_focus(events, mouse_x, mouse_y)
 
     def algorithm_page(self, events: pygame.event.Event):
-        self.back_button.draw()
+        self.draw_widget(self.back_button)
         for event in events:
             if event.type == pygame.MOUSEBUTTONDOWN:
                 mouse_x, mouse_y = pygame.mouse.get_pos()
+                if hasattr(self.current_algorithm_obj, "query_at"):
+                    # Clicking a query of a batch drills into its search
+                    query = self.current_algorithm_obj.query_at(mouse_x, mouse_y)
+                    if query is not None:
+                        self.current_algorithm_obj.select_query(query)
+                        self.scheduler.reset()
+                        self.request_full_redraw()
                 if self.back_button.is_mouse_over(mouse_x, mouse_y):
+                    self.close_algorithm()
                     self.state = "home"
                     self.algorithm_chosen = None
-                    self.current_algorithm_obj = None
                     self.input_boxes = []
                     self.buttons = []
                     self._ui_variables_bounded = False
+                    self.request_full_redraw()
+            elif event.type == pygame.KEYDOWN and self.current_algorithm_obj:
+                # Space pauses, up/down change the speed, right single steps and end runs to the end
+                if event.key == pygame.K_SPACE:
+                    self.scheduler.toggle_pause()
+                elif event.key == pygame.K_UP:
+                    self.scheduler.faster()
+                elif event.key == pygame.K_DOWN:
+                    self.scheduler.slower()
+                elif event.key == pygame.K_RIGHT:
+                    self.scheduler.single_step()
+                elif event.key == pygame.K_END:
+                    self.scheduler.run_to_end()
+                # Left moves back through the algorithm's timeline, home returns to the first step
+                elif event.key == pygame.K_LEFT:
+                    self.scheduler.pause()
+                    self.current_algorithm_obj.previous_step()
+                elif event.key == pygame.K_HOME:
+                    self.scheduler.pause()
+                    self.current_algorithm_obj.seek(0)
+                # Pages without an array (e.g. the complexity analysis) have no viewport to zoom or scroll
+                elif self.current_algorithm_obj.cell_array_obj is None:
+                    pass
+                # Plus/minus zoom the array's viewport and F makes it follow the algorithm again
+                elif event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                    self.current_algorithm_obj.cell_array_obj.zoom_by(1.25)
+                elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                    self.current_algorithm_obj.cell_array_obj.zoom_by(0.8)
+                elif event.key == pygame.K_f:
+                    self.current_algorithm_obj.cell_array_obj.set_follow(True)
+                # C switches a race between stepping in lockstep and by cost
+                elif event.key == pygame.K_c and hasattr(self.current_algorithm_obj, "toggle_mode"):
+                    self.current_algorithm_obj.toggle_mode()
+                    self.request_full_redraw()
+                # Escape returns from a search of a batch to the whole batch
+                elif event.key == pygame.K_ESCAPE and hasattr(self.current_algorithm_obj, "select_query"):
+                    self.current_algorithm_obj.select_query(None)
+                    self.request_full_redraw()
+                # B switches between boxed cells and the bar chart
+                elif event.key == pygame.K_b:
+                    self.current_algorithm_obj.cell_array_obj.toggle_render_mode()
+                    self.request_full_redraw()
+            elif event.type == pygame.MOUSEWHEEL and self.current_algorithm_obj and self.current_algorithm_obj.cell_array_obj:
+                # The mouse wheel scrolls the array's viewport, or zooms it while ctrl is held
+                cell_array = self.current_algorithm_obj.cell_array_obj
+                if pygame.key.get_mods() & pygame.KMOD_CTRL:
+                    cell_array.zoom_by(1.25 if event.y > 0 else 0.8)
+                else:
+                    cell_array.scroll_by((event.x - event.y) * 3)
 
         # Draw out the algorithm
-        # Algorithms must have a draw and next_step function
+        # Algorithms must have a draw, draw_dirty and next_step function
         if self.current_algorithm_obj:
-            self.current_algorithm_obj.draw(screen)
-            current_time = pygame.time.get_ticks()
-            if current_time - self.time >= self.interval:
-                self.time = current_time
+            # Every step owed this frame is run as one batch and only the final state is drawn
+            if not self.current_algorithm_obj.solved:
+                profiler = self.profiler
+                if profiler:
+                    profiler.mark("page")
+                start = perf_counter()
+                steps = self.scheduler.run(self.current_algorithm_obj, start, self._frame_deadline)
+                self._step_time = perf_counter() - start
+                if profiler:
+                    profiler.mark("step")
+                    profiler.add_steps(steps)
+
+            if self.redraw_all:
                 self.current_algorithm_obj.draw(screen)
-                self.current_algorithm_obj.next_step()
+            else:
+                self.dirty_rects.extend(self.current_algorithm_obj.draw_dirty(screen))
+
+            status = f"Step {self.current_algorithm_obj.step_count}   {self.scheduler.describe()}"
+            self.draw_status(status, 300, SCREEN_HEIGHT - 85)
+            if hasattr(self.current_algorithm_obj, "get_counts"):
+                counts = self.current_algorithm_obj.get_counts()
+                self.draw_status("   ".join(f"{name} {format_count(count)}" for name, count in counts.items()), 300, SCREEN_HEIGHT - 55)
+
+            # Pages without an array (e.g. the complexity analysis) have no single run to count
+            if (self.current_algorithm_obj.solved and not self._counters_exported
+                    and self.current_algorithm_obj.cell_array_obj is not None):
+                self.export_counters()
+
+    def close_algorithm(self) -> None:
+        # Cancels the algorithm's step worker so it does not keep computing steps that will never be shown
+        if self.current_algorithm_obj:
+            self.current_algorithm_obj.close()
+        self.current_algorithm_obj = None
+
+    def export_counters(self) -> None:
+        # Prints the operation counts of the finished algorithm (or of every algorithm of a race)
+        algorithm = self.current_algorithm_obj
+        algorithms = [pane.algorithm for pane in algorithm.panes] if hasattr(algorithm, "panes") else [algorithm]
+        for algorithm in algorithms:
+            record = {
+                "algorithm": algorithm.title,
+                "n": len(algorithm.cell_array_obj),
+                "steps": algorithm.step_count,
+                **algorithm.get_counts()
+            }
+            print(json.dumps(record))
+            if self.counters_out:
+                with open(self.counters_out, "a") as file:
+                    file.write(json.dumps(record) + "\n")
+        self._counters_exported = True
+
+    def draw_status(self, text: str, x: int, y: int) -> None:
+        # Status text changes often, so each line is only redrawn (over its own background) when it changes
+        if not self.redraw_all and text == self._drawn_status.get(y):
+            return
+        rect = pygame.Rect(x, y, SCREEN_WIDTH - x, 30)
+        screen.fill(colors.BACKGROUND_COLOR, rect)
+        draw_text(screen, font, colors.SELECTED_COLOR, text, x, y)
+        self.dirty_rects.append(rect)
+        self._drawn_status[y] = text
+
+
+def format_count(count: int) -> str:
+    # Large counts are shortened (e.g. 4.52M) so every counter fits on one line
+    if count < 10_000:
+        return str(count)
+    if count < 1_000_000:
+        return f"{count / 1000:.1f}k"
+    return f"{count / 1_000_000:.2f}M"
 
 
 if __name__ == "__main__":
-    visualizer = AlgorithmVisualizer()
+    parser = argparse.ArgumentParser(description="Algorithm visualizer built with pygame")
+    parser.add_argument("--full-redraw", action="store_true", help="redraw the whole screen every frame instead of only the changed areas")
+    parser.add_argument("--profile-csv", help="write the phase timings of every frame to a CSV file")
+    parser.add_argument("--counters-out", help="append the operation counts of every finished algorithm to a JSON lines file")
+    parser.add_argument("--step-worker", choices=workers.MODES, default=workers.mode,
+                        help="compute algorithm steps on the render thread (inline) or ahead of it in a worker thread or process")
+    parser.add_argument("--replay", help="replay a trace file recorded with traces.py")
+    parser.add_argument("--no-idle", action="store_true", help="render every frame even when nothing is animating")
+    parser.add_argument("--loop-stats", action="store_true", help="print the frames rendered, time idle and CPU use on exit")
+    parser.add_argument("--startup-stats", action="store_true",
+                        help="print the milliseconds from start to the imports, display and first frame, then exit")
+    args = parser.parse_args()
+    workers.set_mode(args.step_worker)
+
+    visualizer = AlgorithmVisualizer("full" if args.full_redraw else "dirty", args.profile_csv, args.counters_out,
+                                     not args.no_idle, args.loop_stats, args.replay, args.startup_stats)
     visualizer.run()
\ No newline at end of file
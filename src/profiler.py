@@ -0,0 +1,160 @@
+import csv
+import sys
+import pygame
+from collections import deque
+from time import perf_counter, process_time
+from typing import Optional
+
+from config import colors, font
+from widgets import draw_text
+
+
+# Measures how long each phase of every frame takes
+# The main loop calls begin_frame, then mark after each phase with the phase's name, then end_frame
+class FrameProfiler:
+    PHASES = ("events", "page", "step", "hud", "update")
+
+    def __init__(self, history: int = 240, csv_path: Optional[str] = None) -> None:
+        """
+        Args:
+            history (int, optional): Number of recent frames the HUD statistics are computed over.
+            csv_path (Optional[str], optional): File to write the timings of every frame to.
+        """
+        self.show_hud = False
+
+        # Recent (frame end time, frame length, steps) tuples
+        self.frames = deque(maxlen=history)
+        self.frame_count = 0
+
+        self._frame_start = 0.0
+        self._last_mark = 0.0
+        self._phases = dict.fromkeys(self.PHASES, 0.0)
+        self._steps = 0
+
+        self._csv_file = None
+        self._csv = None
+        if csv_path:
+            self._csv_file = open(csv_path, "w", newline="")
+            self._csv = csv.writer(self._csv_file)
+            self._csv.writerow(["frame", "frame_ms", *(f"{phase}_ms" for phase in self.PHASES), "idle_ms", "steps"])
+
+    def is_recording(self) -> bool:
+        return self._csv is not None
+
+    def begin_frame(self) -> None:
+        self._frame_start = self._last_mark = perf_counter()
+        for phase in self.PHASES:
+            self._phases[phase] = 0.0
+        self._steps = 0
+
+    def mark(self, phase: str) -> None:
+        # Adds the time since the previous mark to the phase
+        now = perf_counter()
+        self._phases[phase] += now - self._last_mark
+        self._last_mark = now
+
+    def add_steps(self, steps: int) -> None:
+        self._steps += steps
+
+    def end_frame(self) -> None:
+        now = perf_counter()
+        frame_length = now - self._frame_start
+        self.frames.append((now, frame_length, self._steps))
+        self.frame_count += 1
+
+        if self._csv:
+            # Whatever was not marked (mostly waiting for the next frame in clock.tick) is idle time
+            self._csv.writerow([
+                self.frame_count,
+                f"{frame_length * 1000:.3f}",
+                *(f"{self._phases[phase] * 1000:.3f}" for phase in self.PHASES),
+                f"{(now - self._last_mark) * 1000:.3f}",
+                self._steps
+            ])
+
+    def stats(self) -> dict[str, float]:
+        """Returns the FPS, median and 99th percentile frame time (ms) and steps per second of the recent frames."""
+        if len(self.frames) < 2:
+            return {"fps": 0.0, "p50_ms": 0.0, "p99_ms": 0.0, "steps_per_s": 0.0}
+
+        lengths = sorted(length for _, length, _ in self.frames)
+        elapsed = self.frames[-1][0] - self.frames[0][0] + self.frames[0][1]
+        steps = sum(steps for _, _, steps in self.frames)
+        return {
+            "fps": len(self.frames) / elapsed,
+            "p50_ms": lengths[len(lengths) // 2] * 1000,
+            "p99_ms": lengths[min(len(lengths) - 1, int(len(lengths) * 0.99))] * 1000,
+            "steps_per_s": steps / elapsed
+        }
+
+    def draw_hud(self, screen: pygame.Surface) -> pygame.Rect:
+        """Draws the statistics in the top right corner, returning the area drawn over."""
+        stats = self.stats()
+        lines = [
+            f"FPS {stats['fps']:.1f}",
+            f"p50 {stats['p50_ms']:.2f} ms",
+            f"p99 {stats['p99_ms']:.2f} ms",
+            f"steps/s {stats['steps_per_s']:.1f}"
+        ]
+
+        rect = pygame.Rect(screen.get_width() - 210, 10, 200, 26 * len(lines) + 10)
+        pygame.draw.rect(screen, colors.BACKGROUND_COLOR, rect)
+        pygame.draw.rect(screen, colors.INACTIVE_COLOR, rect, 2)
+        for i, line in enumerate(lines):
+            draw_text(screen, font, colors.SELECTED_COLOR, line, rect.x + 10, rect.y + 5 + i * 26)
+        return rect
+
+    def close(self) -> None:
+        if self._csv_file:
+            self._csv_file.close()
+            self._csv_file = None
+            self._csv = None
+
+
+# Counts the frames the main loop rendered and the time it spent blocked waiting for input while idle,
+# so the CPU use of an idle window can be checked against one that renders every frame
+class LoopStats:
+    def __init__(self) -> None:
+        self._start = perf_counter()
+        self._cpu_start = process_time()
+
+        self.frames = 0
+        self.idle_waits = 0
+        self.idle_time = 0.0
+
+    def add_frame(self) -> None:
+        self.frames += 1
+
+    def add_idle(self, seconds: float) -> None:
+        self.idle_waits += 1
+        self.idle_time += seconds
+
+    def summary(self) -> dict[str, float]:
+        """Returns the frames rendered, average FPS, time idle and CPU use since the loop started."""
+        elapsed = max(perf_counter() - self._start, 1e-9)
+        cpu = process_time() - self._cpu_start
+        return {
+            "seconds": round(elapsed, 3),
+            "frames": self.frames,
+            "avg_fps": round(self.frames / elapsed, 2),
+            "idle_waits": self.idle_waits,
+            "idle_fraction": round(self.idle_time / elapsed, 4),
+            "cpu_seconds": round(cpu, 3),
+            "cpu_percent": round(100 * cpu / elapsed, 2)
+        }
+
+
+# Times startup up to the first frame, from a perf_counter reading taken as early as possible
+# Each phase is marked once with the time since that reading, marking it again does nothing
+class StartupTimer:
+    def __init__(self, start: float) -> None:
+        self.start = start
+        self.marks = {}
+
+    def mark(self, phase: str) -> None:
+        self.marks.setdefault(phase, perf_counter() - self.start)
+
+    def summary(self) -> dict[str, float]:
+        """Returns the milliseconds until every phase was marked and the number of modules imported so far."""
+        return {**{f"{phase}_ms": round(seconds * 1000, 1) for phase, seconds in self.marks.items()},
+                "modules": len(sys.modules)}
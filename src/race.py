@@ -0,0 +1,209 @@
+import pygame
+from array import array
+from typing import Callable, Sequence
+
+from algorithms import InsertionSort, MergeSort, StepAlgorithm
+from cell import CellArray
+from config import colors, header, font
+from steps import step_cost
+from widgets import draw_text, InputBox, Button
+from utils import cell_array_init, get_input_data
+
+
+# Algorithms that can race, by the label typed to choose them
+RACERS: dict[str, Callable[[CellArray, int, int], StepAlgorithm]] = {
+    "isa": InsertionSort,
+    "msa": MergeSort
+}
+
+
+# One algorithm of a race and its progress
+class Pane:
+    def __init__(self, algorithm: StepAlgorithm) -> None:
+        self.algorithm = algorithm
+
+        # Work done (see steps.step_cost), and work the pane may still do before its next step when racing by cost
+        self.work = 0
+        self.credit = 0
+
+        # Finishing position, 1 for the winner
+        self.place = None
+
+    def describe(self) -> str:
+        text = f"{self.algorithm.title}: {self.algorithm.step_count} steps, {self.work} ops"
+        if self.place is not None:
+            text += f" (finished #{self.place})"
+        return text
+
+
+# Runs several algorithms side by side on the same input, each in its own pane
+# The input is shared as one read-only buffer that each pane's CellArray only copies once the algorithm writes to it,
+# though every sort still copies the input for its step generator as soon as it is created.
+# A race is stepped like a single algorithm, each step is one tick where every unfinished pane either takes one step
+# ("lockstep") or gets one unit of work to spend, taking a step whenever it has work left ("cost"),
+# so a pane whose steps do more work moves more slowly
+class Race:
+    title = "Algorithm Race"
+    MODES = ("lockstep", "cost")
+
+    def __init__(self, screen: pygame.Surface, values: Sequence[int], labels: list[str], x: int, y: int) -> None:
+        """
+        Args:
+            screen (pygame.Surface): The pygame screen.
+            values (Sequence[int]): The input every algorithm runs on.
+            labels (list[str]): The RACERS to race.
+            x (int): x-position of the panes.
+            y (int): y-position the race is laid out around, the title is drawn 100 pixels above it and the panes start 50 pixels above it.
+
+        Raises:
+            ValueError: If a label is not one of the RACERS.
+        """
+        self.x = x
+        self.y = y
+        self.mode = "lockstep"
+        self.solved = False
+        self.ticks = 0
+
+        if isinstance(values, memoryview):
+            shared = values.toreadonly()
+        else:
+            source = values if isinstance(values, array) else array("q", values)
+            shared = memoryview(bytes(source)).cast(source.typecode)
+        self.panes = []
+        for label in labels:
+            if label not in RACERS:
+                raise ValueError(f"Unknown algorithm {label}, expected one of {', '.join(RACERS)}")
+            self.panes.append(Pane(RACERS[label](CellArray(screen, shared), x, y)))
+
+        # Panes split the height between y - 50 and the back button
+        self.pane_height = (screen.get_height() - 110 - (y - 50)) // max(1, len(self.panes))
+        for pane in self.panes:
+            pane.algorithm.cell_array_obj.bars.height = max(20, self.pane_height - 40)
+
+        self._drawn_text = [None] * len(self.panes)
+
+    @property
+    def cell_array_obj(self) -> CellArray:
+        # Zooming and scrolling act on the first pane, the others follow its viewport
+        return self.panes[0].algorithm.cell_array_obj
+
+    @property
+    def step_count(self) -> int:
+        return self.ticks
+
+    def toggle_mode(self) -> None:
+        self.mode = self.MODES[(self.MODES.index(self.mode) + 1) % len(self.MODES)]
+        for pane in self.panes:
+            pane.credit = 0
+
+    def next_step(self) -> None:
+        self.ticks += 1
+        for pane in self.panes:
+            algorithm = pane.algorithm
+            if algorithm.solved:
+                continue
+
+            pane.credit += 1
+            while pane.credit > 0 and not algorithm.solved:
+                algorithm.next_step()
+                cost = step_cost(algorithm.last_step)
+                pane.work += cost
+                pane.credit -= cost if self.mode == "cost" else 1
+
+            if algorithm.solved and pane.place is None:
+                pane.place = 1 + sum(other.place is not None for other in self.panes)
+        self.solved = all(pane.algorithm.solved for pane in self.panes)
+
+    def is_step_ready(self) -> bool:
+        return all(pane.algorithm.is_step_ready() for pane in self.panes if not pane.algorithm.solved)
+
+    def close(self) -> None:
+        for pane in self.panes:
+            pane.algorithm.close()
+
+    def previous_step(self) -> None:
+        # Every pane goes back one of its own steps, panes that are no longer finished lose their place
+        self.ticks = max(0, self.ticks - 1)
+        for pane in self.panes:
+            pane.algorithm.previous_step()
+            pane.credit = 0
+            if not pane.algorithm.solved:
+                pane.place = None
+        self.solved = all(pane.algorithm.solved for pane in self.panes)
+
+    def seek(self, step: int) -> None:
+        # Only returning to the start is supported, ticks do not map to the same step of every pane
+        # (a pane whose oldest steps were dropped by its timeline's memory cap returns to its earliest kept step)
+        if step != 0:
+            raise ValueError("Races can only seek to the start")
+        self.ticks = 0
+        for pane in self.panes:
+            pane.algorithm.seek(0)
+            pane.credit = 0
+            if pane.algorithm.step_count == 0:
+                pane.work = 0
+                pane.place = None
+        self.solved = all(pane.algorithm.solved for pane in self.panes)
+
+    def _pane_top(self, index: int) -> int:
+        return self.y - 50 + index * self.pane_height
+
+    def _array_y(self, index: int) -> int:
+        # Room is left for the progress text, and for the index labels above boxed cells
+        cell_array = self.panes[index].algorithm.cell_array_obj
+        return self._pane_top(index) + (30 if cell_array.render_mode == "bars" else 80)
+
+    def _sync_views(self) -> None:
+        first = self.cell_array_obj
+        for pane in self.panes[1:]:
+            cell_array = pane.algorithm.cell_array_obj
+            cell_array.render_mode, cell_array.cell_size, cell_array.scroll = first.render_mode, first.cell_size, first.scroll
+            cell_array.follow = False
+
+    def _draw_progress(self, screen: pygame.Surface, index: int, force: bool) -> list[pygame.Rect]:
+        text = self.panes[index].describe()
+        if not force and text == self._drawn_text[index]:
+            return []
+        rect = pygame.Rect(self.x, self._pane_top(index), screen.get_width() - 2 * self.x, 26)
+        screen.fill(colors.BACKGROUND_COLOR, rect)
+        draw_text(screen, font, colors.SELECTED_COLOR, text, rect.x, rect.y)
+        self._drawn_text[index] = text
+        return [rect]
+
+    def draw(self, screen: pygame.Surface) -> None:
+        draw_text(screen, header, colors.SELECTED_COLOR, f"{self.title} ({self.mode})", self.x, self.y - 100)
+        self._sync_views()
+        for i, pane in enumerate(self.panes):
+            self._draw_progress(screen, i, True)
+            pane.algorithm.cell_array_obj.draw(self.x, self._array_y(i))
+
+    def draw_dirty(self, screen: pygame.Surface) -> list[pygame.Rect]:
+        self._sync_views()
+        rects = []
+        for i, pane in enumerate(self.panes):
+            rects.extend(self._draw_progress(screen, i, False))
+            rects.extend(pane.algorithm.cell_array_obj.draw_dirty(self.x, self._array_y(i)))
+        return rects
+
+
+class RaceUI:
+    def __init__(self, screen: pygame.Surface) -> None:
+        self.input_boxes = [
+            InputBox(screen, "Array to sort (seperated by commas, @file or random:n)", 50, 140, 500, 50, 200),
+            InputBox(screen, f"Algorithms to race ({', '.join(RACERS)})", 50, 240, 500, 50, 40)
+        ]
+        self.buttons = [
+            Button(screen, "Submit", 50, 320, 125, 60, get_input_data(self.input_boxes))
+        ]
+
+
+def create_race(screen: pygame.Surface, user_input: str, labels: str, x: int, y: int) -> Race:
+    """Creates a Race from the text typed into the RaceUI.
+
+    Raises:
+        ValueError: If the array is invalid or a label is not one of the RACERS.
+    """
+    cell_array = cell_array_init(screen, user_input)
+    if cell_array is None:
+        raise ValueError(f"Invalid array {user_input}")
+    return Race(screen, cell_array.values, [label.strip() for label in labels.split(",")], x, y)
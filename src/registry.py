@@ -0,0 +1,41 @@
+import importlib
+from collections import namedtuple
+from typing import Any
+
+import pygame
+
+
+# An algorithm that can be chosen on the home page, by the label main.py knows it by
+# Its UI (a class with input_boxes and buttons) and the function that creates it from the text typed into the UI
+# are given as "module:name" and only imported once the algorithm is chosen, so starting up imports no algorithm.
+# A create function is called as create(screen, *typed_text, x, y) and raises a ValueError if the text is invalid
+Entry = namedtuple("Entry", ["label", "title", "ui", "create"])
+
+ALGORITHMS = {entry.label: entry for entry in (
+    Entry("bsa", "Binary Search Algorithm", "algorithms:BinarySearchUI", "batch_search:create_search"),
+    Entry("isa", "Insertion Sort Algorithm", "algorithms:InsertionSortUI", "algorithms:create_insertion_sort"),
+    Entry("msa", "Merge Sort Algorithm", "algorithms:MergeSortUI", "algorithms:create_merge_sort"),
+    Entry("dsa", "Dijkstra's Algorithm", "algorithms:DijkstraUI", "algorithms:create_dijkstra"),
+    Entry("race", "Algorithm Race", "race:RaceUI", "race:create_race"),
+    Entry("analyze", "Complexity Analysis", "complexity_view:ComplexityUI", "complexity_view:create_analysis"),
+)}
+
+
+def load(path: str) -> Any:
+    """Imports and returns the object at a "module:name" path."""
+    module, name = path.split(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def create_ui(label: str, screen: pygame.Surface) -> Any:
+    """Returns the UI of an algorithm, importing it the first time."""
+    return load(ALGORITHMS[label].ui)(screen)
+
+
+def create_algorithm(label: str, screen: pygame.Surface, inputs: list[str], x: int, y: int) -> Any:
+    """Creates an algorithm from the text typed into its UI.
+
+    Raises:
+        ValueError: If the text is invalid.
+    """
+    return load(ALGORITHMS[label].create)(screen, *inputs, x, y)
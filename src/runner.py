@@ -0,0 +1,300 @@
+import argparse
+import heapq
+import json
+import os
+import random
+import sys
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from time import perf_counter
+from typing import Any, Callable, Iterator, Optional
+
+from datasets import KINDS, load_values
+from graph import Graph, load_graph
+from heap import MinHeap
+from steps import (COMPARISONS, COUNTER_NAMES, KEY, READS, SWAPS, WRITES, Op, Step, binary_search_steps,
+                   dijkstra_steps, insertion_sort_steps, is_sorted, merge_sort_steps)
+
+
+# Runs algorithms headless over many input cases, for grading and regression checks, writing one JSON line per case
+# Only the step engine is used, never pygame, so operations are counted from the step events the same way
+# the visualizer's CellArrays count them
+
+
+# Counts the operations of an algorithm's step events, and keeps what its result is checked against
+class OpCounter:
+    def __init__(self, heap_capacity: int = 0) -> None:
+        """
+        Args:
+            heap_capacity (int, optional): Number of nodes of the graph, for algorithms whose heap writes are counted.
+        """
+        self.counters = array("q", [0]) * len(COUNTER_NAMES)
+        self.steps = 0
+
+        # Index given by the last FOUND event (-1 if none), whether SOLVED was seen and the distance set by every RELAX
+        self.found = -1
+        self.solved = False
+        self.dist = {}
+
+        # Mirror of the algorithm's heap, which counts a write every time a node is moved like the drawn heap does
+        self.heap = MinHeap(heap_capacity)
+        self.heap.on_write = self._heap_written
+
+    def _heap_written(self, index: int, node: int) -> None:
+        self.counters[WRITES] += 1
+
+    def run(self, steps: Iterator[Step]) -> None:
+        """Applies every step to completion."""
+        for step in steps:
+            self.steps += 1
+            for event in step:
+                self.apply(event)
+
+    def apply(self, event: tuple) -> None:
+        op, a, b, c = event
+        counters = self.counters
+        if op == Op.COMPARE:
+            counters[COMPARISONS] += 1
+            counters[READS] += 1 if b == KEY else 2
+        elif op == Op.SWAP:
+            counters[SWAPS] += 1
+            counters[READS] += 2
+            counters[WRITES] += 2
+        elif op == Op.AUX_COPY:
+            counters[READS] += b - a + 1
+            counters[WRITES] += b - a + 1
+        elif op == Op.AUX_COMPARE:
+            counters[COMPARISONS] += 1
+            counters[READS] += 2
+        elif op == Op.AUX_TAKE:
+            counters[READS] += 1
+            counters[WRITES] += 1
+        elif op == Op.EDGE_SCAN:
+            counters[READS] += 1
+            counters[COMPARISONS] += 1
+        elif op == Op.RELAX:
+            self.dist[a] = c
+            self.heap.push_or_decrease(a, c)
+        elif op == Op.HEAP_POP:
+            self.heap.pop()
+        elif op == Op.FOUND:
+            self.found = a
+        elif op == Op.SOLVED:
+            self.solved = True
+
+    def get_counts(self) -> dict[str, int]:
+        return dict(zip(COUNTER_NAMES, self.counters))
+
+
+# What a case needs to run an algorithm: its steps, the size of its heap (0 if it has none),
+# a check of the finished counter that returns True if the result is correct, and the case's fields to report
+Prepared = namedtuple("Prepared", ["steps", "heap_capacity", "check", "fields"])
+
+
+def _query(values, case: dict, seed: Optional[int]) -> int:
+    # The value to find is either given or drawn from just below the smallest to just above the largest value
+    if case.get("value") is not None:
+        return int(case["value"])
+    if not len(values):
+        return 0
+    return random.Random(seed).randint(values[0] - 1, values[-1] + 1)
+
+
+def prepare_binary_search(case: dict, seed: Optional[int]) -> Prepared:
+    values = load_values(case["input"])
+    if not is_sorted(values):
+        raise ValueError("Binary search needs the array to be sorted")
+    value = _query(values, case, seed)
+
+    def check(counter: OpCounter) -> bool:
+        if counter.found == -1:
+            index = bisect_left(values, value)
+            return counter.solved and (index == len(values) or values[index] != value)
+        return counter.solved and values[counter.found] == value
+
+    return Prepared(binary_search_steps(values, value), 0, check, {"n": len(values), "value": value})
+
+
+def _prepare_sort(steps_function: Callable[[array], Iterator[Step]]) -> Callable[[dict, Optional[int]], Prepared]:
+    def prepare(case: dict, seed: Optional[int]) -> Prepared:
+        # The sorts work in place on a copy, which is compared with the sorted input once they finish
+        values = array("q", load_values(case["input"]))
+        expected = sorted(values)
+
+        def check(counter: OpCounter) -> bool:
+            return counter.solved and values.tolist() == expected
+
+        return Prepared(steps_function(values), 0, check, {"n": len(values)})
+    return prepare
+
+
+def reference_distances(graph: Graph, source: int) -> dict[int, int]:
+    """Returns the distance of every node reachable from source, found with a plain heapq Dijkstra."""
+    dist = {source: 0}
+    queue = [(0, source)]
+    while queue:
+        d, u = heapq.heappop(queue)
+        if d > dist[u]:
+            continue
+        for e in graph.edges(u):
+            v, new_dist = graph.targets[e], d + graph.weights[e]
+            if v not in dist or new_dist < dist[v]:
+                dist[v] = new_dist
+                heapq.heappush(queue, (new_dist, v))
+    return dist
+
+
+def prepare_dijkstra(case: dict, seed: Optional[int]) -> Prepared:
+    graph = load_graph(case["input"])
+    source = int(case.get("source") or 0)
+    target = case.get("target")
+    target = None if target is None else int(target)
+
+    def check(counter: OpCounter) -> bool:
+        if not counter.solved:
+            return False
+        expected = reference_distances(graph, source)
+        if target is not None:
+            return counter.dist.get(target) == expected.get(target)
+        return counter.dist == expected
+
+    fields = {"n": graph.num_nodes, "edges": graph.num_edges, "source": source, "target": target}
+    return Prepared(dijkstra_steps(graph, source, target), graph.num_nodes, check, fields)
+
+
+# Algorithms the runner can run, by the labels main.py uses for them
+# graph_input is True for algorithms given graph specs instead of dataset specs, which are seeded differently
+Runner = namedtuple("Runner", ["prepare", "graph_input"])
+RUNNERS = {
+    "bsa": Runner(prepare_binary_search, False),
+    "isa": Runner(_prepare_sort(insertion_sort_steps), False),
+    "msa": Runner(_prepare_sort(merge_sort_steps), False),
+    "dsa": Runner(prepare_dijkstra, True),
+}
+
+
+def seeded_spec(spec: str, seed: int, graph_input: bool = False) -> str:
+    """Returns a generated input spec with the seed added, or the spec itself if it is not generated or already seeded."""
+    parts = spec.strip().split(":")
+    if graph_input:
+        unseeded = (parts[0] == "grid" and len(parts) == 2) or (parts[0] == "random" and len(parts) == 3)
+    else:
+        unseeded = parts[0] in KINDS and len(parts) == 2
+    return f"{spec.strip()}:{seed}" if unseeded else spec
+
+
+def run_case(algorithm: str, case: dict) -> dict[str, Any]:
+    """Runs one case to completion and returns its result record.
+
+    Args:
+        algorithm (str): Label of the algorithm in RUNNERS.
+        case (dict): The case: "index", "input" (values or a spec), optionally "seed", "value" (bsa),
+            "source" and "target" (dsa), and "expected" (a record, or part of one, to compare the result with).
+
+    Returns:
+        dict[str, Any]: The case's index, algorithm, input, steps, operation counts, seconds, whether the result was
+        correct, the error that stopped the algorithm (or None) and, if expected was given, the fields that differ.
+    """
+    record = {"case": case["index"], "algorithm": algorithm, "input": case["input"]}
+    try:
+        # Cases without a seed are seeded by their index, so the same cases always give the same records
+        prepared = RUNNERS[algorithm].prepare(case, case.get("seed", case["index"]))
+        record.update(prepared.fields)
+        counter = OpCounter(prepared.heap_capacity)
+        start = perf_counter()
+        counter.run(prepared.steps)
+        record["seconds"] = perf_counter() - start
+        record["steps"] = counter.steps
+        record.update(counter.get_counts())
+        record["correct"] = prepared.check(counter)
+        record["error"] = None
+    except (ValueError, OverflowError, OSError, IndexError, KeyError) as error:
+        record["correct"] = False
+        record["error"] = f"{type(error).__name__}: {error}"
+
+    if "expected" in case:
+        record["mismatches"] = {key: [value, record.get(key)] for key, value in case["expected"].items()
+                                if record.get(key) != value}
+    return record
+
+
+def generate_cases(algorithm: str, spec: str, count: int, seed: int, **fields: Any) -> list[dict]:
+    """Returns count cases of one input spec, generated specs without a seed are given seed, seed + 1, ..."""
+    graph_input = RUNNERS[algorithm].graph_input
+    return [{"index": i, "input": seeded_spec(spec, seed + i, graph_input), "seed": seed + i, **fields}
+            for i in range(count)]
+
+
+def load_cases(path: str) -> list[dict]:
+    """Reads cases from a JSON lines file with one case object (see run_case) per line."""
+    cases = []
+    with open(path) as file:
+        for line in file:
+            if line.strip():
+                case = json.loads(line)
+                case.setdefault("index", len(cases))
+                cases.append(case)
+    return cases
+
+
+def run_cases(algorithm: str, cases: list[dict], workers: Optional[int] = None) -> Iterator[dict[str, Any]]:
+    """Yields the record of every case in order, spreading them across a pool of worker processes.
+
+    Args:
+        algorithm (str): Label of the algorithm in RUNNERS.
+        cases (list[dict]): The cases to run.
+        workers (Optional[int], optional): Number of worker processes, None for one per CPU and 1 to run in this process.
+    """
+    if workers == 1:
+        yield from map(run_case, repeat(algorithm), cases)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Cases are sent in chunks so small ones are not dominated by the cost of sending them to a worker
+        chunk_size = max(1, len(cases) // (4 * workers))
+        yield from pool.map(run_case, repeat(algorithm), cases, chunksize=chunk_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run algorithms headless over many inputs and report every case as JSON lines")
+    parser.add_argument("algorithm", choices=RUNNERS, help="bsa, isa, msa or dsa, as labelled in main.py")
+    parser.add_argument("input", nargs="?", help="comma seperated values, a dataset spec (e.g. \"random:1000\") "
+                                                 "or a graph spec for dsa (e.g. \"grid:20x20\")")
+    parser.add_argument("--cases", type=int, default=1, help="number of cases of the input, generated inputs get a new seed each")
+    parser.add_argument("--cases-file", help="JSON lines file of cases to run instead of the input")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first case")
+    parser.add_argument("--value", type=int, help="value to find (bsa), drawn at random for each case if not given")
+    parser.add_argument("--source", type=int, default=0, help="node distances are measured from (dsa)")
+    parser.add_argument("--target", type=int, help="node to stop at (dsa)")
+    parser.add_argument("--workers", type=int, help="number of worker processes, one per CPU if not given")
+    parser.add_argument("--out", help="JSON lines file to write the results to instead of stdout")
+    args = parser.parse_args()
+
+    if args.cases_file:
+        cases = load_cases(args.cases_file)
+    elif args.input is not None:
+        cases = generate_cases(args.algorithm, args.input, args.cases, args.seed,
+                               value=args.value, source=args.source, target=args.target)
+    else:
+        parser.error("an input or --cases-file is required")
+
+    start = perf_counter()
+    correct = errors = mismatched = 0
+    out = open(args.out, "w") if args.out else sys.stdout
+    try:
+        for record in run_cases(args.algorithm, cases, args.workers):
+            out.write(json.dumps(record) + "\n")
+            correct += record["correct"]
+            errors += record["error"] is not None
+            mismatched += bool(record.get("mismatches"))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"{len(cases)} cases, {correct} correct, {errors} errors, {mismatched} not as expected "
+          f"in {perf_counter() - start:.2f}s", file=sys.stderr)
+    sys.exit(0 if correct == len(cases) and not mismatched else 1)
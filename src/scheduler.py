@@ -0,0 +1,165 @@
+from enum import Enum
+from time import perf_counter
+from typing import Optional
+
+
+# Enumeration containing all the ways the scheduler can advance an algorithm
+class SchedulerMode(Enum):
+    RUNNING = 1     # steps at the set speed
+    PAUSED = 2      # only steps when single stepped
+    RUN_TO_END = 3  # steps as fast as the frame budget allows until the algorithm is solved
+
+
+# Decides how many steps of an algorithm to run each frame
+# Steps are owed by wall time (speed * elapsed time) rather than by frames, so slow frames do not slow the algorithm down,
+# and all the steps owed in a frame are run as one batch with only the final state being drawn
+class StepScheduler:
+    MIN_SPEED = 0.1
+    MAX_SPEED = 100_000
+
+    def __init__(self, speed: float, frame_budget: float) -> None:
+        """
+        Args:
+            speed (float): Steps per second, clamped between MIN_SPEED and MAX_SPEED.
+            frame_budget (float): Time (in seconds) a frame may always spend stepping, longer if the frame has more time left
+                (see run), left over steps carry to the next frame.
+        """
+        self.speed = min(self.MAX_SPEED, max(self.MIN_SPEED, speed))
+        self.frame_budget = frame_budget
+        self.mode = SchedulerMode.RUNNING
+
+        # Fractional steps owed, and the time steps were last owed up to
+        self._owed = 0.0
+        self._last_time = None
+        self._single_steps = 0
+
+        # Steps per second actually run while running, measured over windows of rate_window seconds (None until measured)
+        self.rate = None
+        self._rate_start = None
+        self._rate_steps = 0
+
+    rate_window = 0.5
+
+    def reset(self) -> None:
+        # Starts over for a new algorithm, keeping the speed
+        self.mode = SchedulerMode.RUNNING
+        self._owed = 0.0
+        self._last_time = None
+        self._single_steps = 0
+        self._reset_rate()
+
+    def _reset_rate(self) -> None:
+        self.rate = None
+        self._rate_start = None
+        self._rate_steps = 0
+
+    def set_speed(self, speed: float) -> None:
+        self.speed = min(self.MAX_SPEED, max(self.MIN_SPEED, speed))
+        self._reset_rate()
+
+    def faster(self) -> None:
+        self.set_speed(self.speed * 2)
+
+    def slower(self) -> None:
+        self.set_speed(self.speed / 2)
+
+    def toggle_pause(self) -> None:
+        if self.mode == SchedulerMode.PAUSED:
+            self.mode = SchedulerMode.RUNNING
+            self._last_time = None
+        else:
+            self.pause()
+
+    def pause(self) -> None:
+        self.mode = SchedulerMode.PAUSED
+        self._owed = 0.0
+        self._reset_rate()
+
+    def single_step(self) -> None:
+        # Pauses and queues exactly one step
+        self.pause()
+        self._single_steps += 1
+
+    def run_to_end(self) -> None:
+        self.mode = SchedulerMode.RUN_TO_END
+
+    def steps_due(self, now: float) -> float:
+        """Returns the number of steps owed at time now (in seconds), which is infinite when running to the end."""
+        elapsed = 0.0 if self._last_time is None else now - self._last_time
+        self._last_time = now
+
+        # Single steps stay queued until run has taken them, as the next step may not be ready yet
+        if self.mode == SchedulerMode.PAUSED:
+            return self._single_steps
+        if self.mode == SchedulerMode.RUN_TO_END:
+            return float("inf")
+
+        # Owed steps are capped at one second's worth so a long stall does not turn into a long burst,
+        # when stepping can not keep up with the speed the rate shown by describe falls behind it instead
+        self._owed = min(self._owed + elapsed * self.speed, max(1.0, self.speed))
+        return int(self._owed)
+
+    def time_until_due(self, now: float) -> Optional[float]:
+        """Returns how long (in seconds) after time now the next step is owed, None if no step is owed until the mode changes."""
+        if self.mode == SchedulerMode.PAUSED:
+            return 0.0 if self._single_steps else None
+        if self.mode == SchedulerMode.RUN_TO_END or self._last_time is None:
+            return 0.0
+        owed = self._owed + (now - self._last_time) * self.speed
+        return max(0.0, (1 - owed) / self.speed)
+
+    def run(self, algorithm, now: float, deadline: Optional[float] = None) -> int:
+        """Runs the steps owed at time now on an algorithm within the frame budget.
+
+        Args:
+            algorithm: Any algorithm with a next_step and is_step_ready function and a solved attribute.
+            now (float): The current time in seconds.
+            deadline (Optional[float], optional): perf_counter time the rest of the frame needs stepping to stop by,
+                stepping runs until then if it is later than the frame budget.
+
+        Returns:
+            int: The number of steps run.
+        """
+        due = self.steps_due(now)
+        deadline = max(perf_counter() + self.frame_budget, deadline or 0.0)
+
+        done = 0
+        while done < due and not algorithm.solved:
+            # Steps computed by a worker may not have arrived yet, they are run next frame
+            if not algorithm.is_step_ready():
+                break
+            algorithm.next_step()
+            done += 1
+
+            # Checking the clock every step would cost more than small steps themselves
+            if done % 64 == 0 and perf_counter() > deadline:
+                break
+
+        if self.mode == SchedulerMode.RUNNING:
+            self._owed -= done
+            self._measure_rate(now, done)
+        elif self.mode == SchedulerMode.PAUSED:
+            # Steps queued past the end are dropped so they do not run after stepping back
+            self._single_steps = 0 if algorithm.solved else self._single_steps - done
+        return done
+
+    def _measure_rate(self, now: float, done: int) -> None:
+        if self._rate_start is None:
+            self._rate_start, self._rate_steps = now, 0
+            return
+        self._rate_steps += done
+        if now - self._rate_start >= self.rate_window:
+            self.rate = self._rate_steps / (now - self._rate_start)
+            self._rate_start, self._rate_steps = now, 0
+
+    def describe(self) -> str:
+        """Returns a short description of the speed and mode, for displaying."""
+        speed = f"{self.speed:g} steps/s"
+        # The rate reached is shown when stepping falls behind the speed set
+        if self.mode == SchedulerMode.RUNNING and self.rate is not None and self.rate < 0.9 * self.speed:
+            speed += f" (reaching {self.rate:.0f})"
+        if self.mode == SchedulerMode.PAUSED:
+            return f"{speed} (paused)"
+        if self.mode == SchedulerMode.RUN_TO_END:
+            return "Running to end"
+        return speed
@@ -0,0 +1,329 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, namedtuple
+from enum import Enum, IntEnum
+from itertools import islice
+from operator import le
+from typing import Iterator, MutableSequence, Optional, Sequence
+
+from graph import Graph
+from heap import MinHeap
+
+
+# Enumeration containing all the states a cell could be in
+class CellState(Enum):
+    ACTIVE = 1
+    INACTIVE = 2
+    SELECTED = 3
+    SOLUTION = 4
+
+
+# Enumeration of every operation a step event can describe
+class Op(IntEnum):
+    COMPARE = 1     # compare(i, j): values at i and j were compared (j is KEY when compared against a search key)
+    SWAP = 2        # swap(i, j): values at i and j were swapped
+    MARK_RANGE = 3  # mark_range(a, b, state): cells a..b (inclusive) were set to a CellState
+    FOUND = 4       # found(i): the searched value is at index i
+    SOLVED = 5      # solved(): the algorithm has finished
+    AUX_COPY = 6    # aux_copy(a, b): values a..b (inclusive) were copied into the same indices of the auxiliary buffer
+    AUX_COMPARE = 7 # aux_compare(i, j): auxiliary values at i and j were compared
+    AUX_TAKE = 8    # aux_take(k, i, state): auxiliary value at i was written to k, which was set to a CellState
+    HEAP_POP = 9    # heap_pop(u, d): node u with distance d was popped from the heap and settled
+    EDGE_SCAN = 10  # edge_scan(e, u): edge e leaving node u was examined
+    RELAX = 11      # relax(v, u, d): the distance of node v was lowered to d through node u, pushing v or decreasing its key
+
+
+# A single step event, the meaning of a, b and c depends on the op
+StepEvent = namedtuple("StepEvent", ["op", "a", "b", "c"])
+
+# A step is the group of events making up one visible step of an algorithm
+Step = tuple[StepEvent, ...]
+
+# Index used by compare events when a value is compared against the search key rather than another index
+KEY = -1
+
+# Operations counted for every run (e.g. by CellArray.counters), by index
+READS, WRITES, COMPARISONS, SWAPS = range(4)
+COUNTER_NAMES = ("reads", "writes", "comparisons", "swaps")
+
+
+def compare(i: int, j: int) -> StepEvent:
+    return StepEvent(Op.COMPARE, i, j, 0)
+
+
+def swap(i: int, j: int) -> StepEvent:
+    return StepEvent(Op.SWAP, i, j, 0)
+
+
+def mark_range(a: int, b: int, state: CellState) -> StepEvent:
+    return StepEvent(Op.MARK_RANGE, a, b, state.value)
+
+
+def found(i: int) -> StepEvent:
+    return StepEvent(Op.FOUND, i, 0, 0)
+
+
+def solved() -> StepEvent:
+    return StepEvent(Op.SOLVED, 0, 0, 0)
+
+
+def aux_copy(a: int, b: int) -> StepEvent:
+    return StepEvent(Op.AUX_COPY, a, b, 0)
+
+
+def aux_compare(i: int, j: int) -> StepEvent:
+    return StepEvent(Op.AUX_COMPARE, i, j, 0)
+
+
+def aux_take(k: int, i: int, state: CellState) -> StepEvent:
+    return StepEvent(Op.AUX_TAKE, k, i, state.value)
+
+
+def heap_pop(u: int, d: int) -> StepEvent:
+    return StepEvent(Op.HEAP_POP, u, d, 0)
+
+
+def edge_scan(e: int, u: int) -> StepEvent:
+    return StepEvent(Op.EDGE_SCAN, e, u, 0)
+
+
+def relax(v: int, u: int, d: int) -> StepEvent:
+    return StepEvent(Op.RELAX, v, u, d)
+
+
+def binary_search_steps(values: Sequence[int], val: int) -> Iterator[Step]:
+    """Yields the steps of a binary search for val, alternating between picking a guess and comparing it.
+
+    Args:
+        values (Sequence[int]): The sorted values to search, which are only read.
+        val (int): The value to find.
+    """
+    start, end = 0, len(values) - 1
+
+    # Pointers to array search area
+    left, right = start, end
+    if left > right:
+        yield (solved(),)
+        return
+
+    while True:
+        # The current guess (midpoint of the search area) is highlighted
+        mid = (left + right) // 2
+        yield (mark_range(mid, mid, CellState.SELECTED),)
+
+        guess_val = values[mid]
+        if guess_val == val:
+            yield (
+                compare(mid, KEY),
+                mark_range(mid, mid, CellState.SOLUTION),
+                mark_range(start, mid - 1, CellState.INACTIVE),
+                mark_range(mid + 1, end, CellState.INACTIVE),
+                found(mid),
+                solved()
+            )
+            return
+
+        # If guess is smaller than value the value is in the larger half of the array, otherwise the smaller half
+        if guess_val < val:
+            events = [compare(mid, KEY), mark_range(start, mid, CellState.INACTIVE)]
+            left = mid + 1
+        else:
+            events = [compare(mid, KEY), mark_range(mid, end, CellState.INACTIVE)]
+            right = mid - 1
+
+        # The search area is empty so the value is not in the array
+        if left > right:
+            events.append(solved())
+            yield tuple(events)
+            return
+        yield tuple(events)
+
+
+def is_sorted(values: Sequence[int]) -> bool:
+    # Compares every pair of neighbours without copying the values
+    return all(map(le, values, islice(values, 1, None)))
+
+
+# Results of many binary searches over the same values (see binary_search_batch)
+# found[q] is the index query q was found at (-1 if missing) and depth[q] the number of probes its search made,
+# heat[i] is the number of searches that probed index i
+BatchResult = namedtuple("BatchResult", ["found", "depth", "heat"])
+
+
+def binary_search_batch(values: Sequence[int], queries: Sequence[int]) -> BatchResult:
+    """Resolves a binary search (probing the same indices as binary_search_steps) for every query at once.
+
+    Where a search probes is decided only by the range of values equal to its query (probes before the range go right,
+    after it go left and inside it find the query), so every query is placed with bisect, and the searches are only
+    walked once for each distinct range however many queries share it.
+
+    Args:
+        values (Sequence[int]): The sorted values to search, which are only read.
+        queries (Sequence[int]): The values to find.
+    """
+    n = len(values)
+    ranges = [(bisect_left(values, val), bisect_right(values, val)) for val in queries]
+
+    heat = array("q", [0]) * n
+    paths = {}
+    for (lo, hi), count in Counter(ranges).items():
+        index, probes = -1, 0
+        left, right = 0, n - 1
+        while left <= right:
+            mid = (left + right) // 2
+            heat[mid] += count
+            probes += 1
+            if mid < lo:
+                left = mid + 1
+            elif mid >= hi:
+                right = mid - 1
+            else:
+                index = mid
+                break
+        paths[lo, hi] = (index, probes)
+
+    found, depth = array("q"), array("q")
+    for key in ranges:
+        index, probes = paths[key]
+        found.append(index)
+        depth.append(probes)
+    return BatchResult(found, depth, heat)
+
+
+def insertion_sort_steps(values: MutableSequence[int]) -> Iterator[Step]:
+    """Yields the steps of an insertion sort, where each step is one comparison and the swap it causes.
+
+    Args:
+        values (MutableSequence[int]): The values to sort, which are sorted in place.
+    """
+    n = len(values)
+    if n < 2:
+        yield (mark_range(0, n - 1, CellState.SOLUTION), solved())
+        return
+
+    yield (mark_range(0, 0, CellState.SOLUTION),)
+
+    for i in range(1, n):
+        # Move the value at i left until the value before it is not larger
+        j = i
+        while j > 0 and values[j] < values[j - 1]:
+            values[j], values[j - 1] = values[j - 1], values[j]
+            yield (compare(j, j - 1), swap(j, j - 1))
+            j -= 1
+
+        # The comparison that stopped the value moving, then 0..i is sorted
+        events = [compare(j, j - 1)] if j > 0 else []
+        events.append(mark_range(0, i, CellState.SOLUTION))
+        if i == n - 1:
+            events.append(solved())
+        yield tuple(events)
+
+
+def merge_sort_steps(values: array) -> Iterator[Step]:
+    """Yields the steps of a bottom-up merge sort, where each step copies a pair of runs into the auxiliary buffer
+    or writes one value back from it.
+
+    Args:
+        values (array): The values to sort, which are sorted in place.
+    """
+    n = len(values)
+    if n < 2:
+        yield (mark_range(0, n - 1, CellState.SOLUTION), solved())
+        return
+
+    # The auxiliary buffer is allocated once and reused by every merge of every pass,
+    # runs are copied into it through memoryviews so no merge allocates a list or array
+    aux = array(values.typecode, values)
+    values_view, aux_view = memoryview(values), memoryview(aux)
+
+    width = 1
+    while width < n:
+        # Values written by the last pass are in their final place
+        state = CellState.SOLUTION if width * 2 >= n else CellState.ACTIVE
+
+        for lo in range(0, n - width, width * 2):
+            mid, hi = lo + width, min(lo + width * 2, n)
+            aux_view[lo:hi] = values_view[lo:hi]
+            yield (aux_copy(lo, hi - 1),)
+
+            # Take the smaller front value of the two runs until both are used up, the last take of the sort also solves it
+            i, j = lo, mid
+            for k in range(lo, hi):
+                if i < mid and (j == hi or aux[i] <= aux[j]):
+                    events = [aux_compare(i, j)] if j < hi else []
+                    source, i = i, i + 1
+                else:
+                    events = [aux_compare(i, j)] if i < mid else []
+                    source, j = j, j + 1
+                values[k] = aux[source]
+                events.append(aux_take(k, source, state))
+                if k == n - 1 and state == CellState.SOLUTION:
+                    events.append(solved())
+                yield tuple(events)
+        width *= 2
+
+
+def dijkstra_steps(graph: Graph, source: int, target: Optional[int] = None) -> Iterator[Step]:
+    """Yields the steps of Dijkstra's algorithm, where each step pops the closest node from the heap or examines one edge.
+
+    Args:
+        graph (Graph): The graph to search, whose weights must not be negative.
+        source (int): The node distances are measured from.
+        target (Optional[int], optional): The node to stop at once its distance is known, or None to find every distance.
+
+    Raises:
+        ValueError: If a weight is negative or the source is not a node of the graph.
+    """
+    n = graph.num_nodes
+    if not 0 <= source < n:
+        raise ValueError(f"Source {source} is not a node of the graph")
+    if graph.weights and min(graph.weights) < 0:
+        raise ValueError("Dijkstra's algorithm needs weights that are not negative")
+
+    # Distance of every node found so far, -1 before the node is reached
+    dist = array("q", [-1]) * n
+    heap = MinHeap(n)
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+
+    dist[source] = 0
+    heap.push(source, 0)
+    yield (relax(source, source, 0),)
+
+    while heap:
+        u, d = heap.pop()
+        if u == target:
+            yield (heap_pop(u, d), solved())
+            return
+        yield (heap_pop(u, d),)
+
+        for e in range(offsets[u], offsets[u + 1]):
+            # Weights are not negative, so settled nodes are never improved on
+            v = targets[e]
+            new_dist = d + weights[e]
+            if dist[v] == -1 or new_dist < dist[v]:
+                dist[v] = new_dist
+                heap.push_or_decrease(v, new_dist)
+                yield (edge_scan(e, u), relax(v, u, new_dist))
+            else:
+                yield (edge_scan(e, u),)
+
+    yield (solved(),)
+
+
+def step_cost(step: Step) -> int:
+    """Returns the work done by a step, counting one for every value compared, moved or copied."""
+    cost = 0
+    for op, a, b, _ in step:
+        if op == Op.AUX_COPY:
+            cost += b - a + 1
+        elif op != Op.MARK_RANGE and op != Op.FOUND and op != Op.SOLVED:
+            cost += 1
+    return cost
+
+
+def run_steps(steps: Iterator[Step]) -> int:
+    """Runs an algorithm's steps to completion without displaying them, returning the number of steps."""
+    count = 0
+    for _ in steps:
+        count += 1
+    return count
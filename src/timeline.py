@@ -0,0 +1,161 @@
+from array import array
+from bisect import bisect_right
+from typing import Any, Callable, Iterator
+
+from steps import Step, StepEvent
+
+
+def snapshot_size(snapshot: Any) -> int:
+    """Returns the number of bytes held by the buffers of a snapshot (nested tuples of bytes-like objects)."""
+    if isinstance(snapshot, (bytes, bytearray, memoryview)):
+        return len(snapshot)
+    if isinstance(snapshot, tuple):
+        return sum(snapshot_size(item) for item in snapshot)
+    return 0
+
+
+# A keyframe snapshot followed by the events of the steps recorded after it
+class Segment:
+    def __init__(self, base: int, snapshot: Any) -> None:
+        # Number of steps applied when the snapshot was taken
+        self.base = base
+        self.snapshot = snapshot
+
+        # Events of every step flattened into (op, a, b, c) integers,
+        # the events of step k of the segment are events[offsets[k] * 4:offsets[k + 1] * 4]
+        self.events = array("q")
+        self.offsets = array("q", [0])
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def nbytes(self) -> int:
+        return snapshot_size(self.snapshot) + (len(self.events) + len(self.offsets)) * 8
+
+    def record(self, step: Step) -> None:
+        for event in step:
+            self.events.extend(event)
+        self.offsets.append(len(self.events) // 4)
+
+    def get_step(self, index: int) -> Step:
+        events = self.events
+        start, stop = self.offsets[index] * 4, self.offsets[index + 1] * 4
+        return tuple(StepEvent._make(events[i:i + 4]) for i in range(start, stop, 4))
+
+
+# Records the steps of an algorithm as it runs so any recorded step can be returned to
+# Every keyframe_interval steps a full snapshot is taken, seeking restores the nearest snapshot and replays the steps after it
+# The snapshots of a large state are taken further apart so their size stays in proportion to the steps they cover,
+# otherwise copying them would cost more than the steps themselves
+class Timeline:
+    def __init__(self, steps: Iterator[Step], apply_step: Callable[[Step], None], snapshot: Callable[[], Any],
+                 restore: Callable[[Any], None], keyframe_interval: int, max_bytes: int,
+                 snapshot_bytes_per_step: int = 0) -> None:
+        """
+        Args:
+            steps (Iterator[Step]): The steps of the algorithm, pulled as the timeline moves past the last recorded step.
+            apply_step (Callable[[Step], None]): Applies a step to the visualized state.
+            snapshot (Callable[[], Any]): Returns a snapshot of the visualized state, as nested tuples of bytes.
+            restore (Callable[[Any], None]): Restores the visualized state from a snapshot.
+            keyframe_interval (int): Least number of steps between snapshots.
+            max_bytes (int): Memory cap of the recorded steps and snapshots, the oldest segments are dropped past it.
+            snapshot_bytes_per_step (int, optional): Snapshots are taken at least a snapshot's size divided by this
+                many steps apart, 0 to always take them keyframe_interval steps apart.
+        """
+        self.steps = steps
+        self.apply_step = apply_step
+        self.snapshot = snapshot
+        self.restore = restore
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.max_bytes = max_bytes
+        self.snapshot_bytes_per_step = snapshot_bytes_per_step
+
+        # Steps between snapshots, set from the size of the last snapshot
+        self.interval = self.keyframe_interval
+
+        self.segments = []
+        self._bases = []
+
+        # Number of steps currently applied, and number of steps recorded so far
+        self.position = 0
+        self.length = 0
+
+        # Set once the algorithm has no steps left
+        self.exhausted = False
+
+    @property
+    def first_step(self) -> int:
+        # Earliest step that can still be returned to
+        return self.segments[0].base if self.segments else 0
+
+    def is_finished(self) -> bool:
+        return self.exhausted and self.position == self.length
+
+    def nbytes(self) -> int:
+        return sum(segment.nbytes() for segment in self.segments)
+
+    def step_forward(self) -> bool:
+        """Applies the next step, replaying it if it was already recorded. Returns False if there are no steps left."""
+        if self.position < self.length:
+            self._replay_to(self.position + 1)
+            return True
+        return self._record_step()
+
+    def step_back(self) -> None:
+        self.seek(self.position - 1)
+
+    def seek(self, target: int) -> None:
+        """Moves to the state after target steps, running the algorithm further if they were not recorded yet.
+
+        Args:
+            target (int): The step to move to, clamped to the recorded (or still recordable) range.
+        """
+        target = max(target, self.first_step)
+
+        if target > self.length:
+            self._replay_to(self.length)
+            while self.length < target and self._record_step():
+                pass
+            return
+
+        # Replaying forward from the current position is cheaper when it is within one keyframe interval
+        if not (self.position <= target <= self.position + self.interval):
+            segment = self.segments[bisect_right(self._bases, target) - 1]
+            self.restore(segment.snapshot)
+            self.position = segment.base
+        self._replay_to(target)
+
+    def _replay_to(self, target: int) -> None:
+        while self.position < target:
+            segment = self.segments[bisect_right(self._bases, self.position) - 1]
+            self.apply_step(segment.get_step(self.position - segment.base))
+            self.position += 1
+
+    def _record_step(self) -> bool:
+        step = next(self.steps, None)
+        if step is None:
+            self.exhausted = True
+            return False
+
+        # Start a new segment with a keyframe snapshot of the state before this step
+        if not self.segments or len(self.segments[-1]) >= self.interval:
+            snapshot = self.snapshot()
+            if self.snapshot_bytes_per_step:
+                self.interval = max(self.keyframe_interval, snapshot_size(snapshot) // self.snapshot_bytes_per_step)
+            self.segments.append(Segment(self.length, snapshot))
+            self._bases.append(self.length)
+            self._enforce_memory_cap()
+
+        self.segments[-1].record(step)
+        self.apply_step(step)
+        self.position += 1
+        self.length += 1
+        return True
+
+    def _enforce_memory_cap(self) -> None:
+        # The segment being recorded into is always kept, so the current step can always be reached
+        total = self.nbytes()
+        while total > self.max_bytes and len(self.segments) > 1:
+            total -= self.segments[0].nbytes()
+            del self.segments[0]
+            del self._bases[0]
@@ -0,0 +1,291 @@
+import argparse
+import mmap
+import struct
+from array import array
+from typing import Iterator, Optional, Sequence
+
+import pygame
+
+from cell import CellArray
+from config import colors, header, trace_chunk_steps
+from steps import Op, Step, StepEvent, binary_search_steps, insertion_sort_steps, is_sorted
+from widgets import draw_text
+
+
+# Trace files hold the step stream of one algorithm run, so it can be replayed (and seeked) without running the algorithm
+#
+# Layout, all little-endian:
+#   header       magic, version, chunk_steps, number of values, number of steps, index offset, title length, then the title
+#   chunks       every chunk_steps steps (at least the number of values): a keyframe of the cells before the chunk's first step (values as int64,
+#                states as bytes and the CellArray counters), followed by the chunk's events
+#   index        (keyframe offset, events offset, number of events, record width) of every chunk
+#
+# Events are fixed-width (op, a, b, c) records of 4 byte fields, or 8 byte fields in chunks with values that do not fit,
+# and the op of the last event of each step is flagged with STEP_END
+MAGIC = b"AVTRACE\0"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQQI")
+INDEX_ENTRY = struct.Struct("<QQQI4x")
+STEP_END = 1 << 16
+
+# Ops a CellArray applies by itself, any other op needs the view of the algorithm that made it
+REPLAYABLE_OPS = {Op.COMPARE, Op.SWAP, Op.MARK_RANGE, Op.FOUND, Op.SOLVED}
+
+_INT32_MIN, _INT32_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+class TraceWriter:
+    def __init__(self, path: str, title: str, values: Sequence[int], chunk_steps: int = trace_chunk_steps) -> None:
+        """Writes a trace file, the steps are added with write_step and the file is finished with close.
+
+        Args:
+            path (str): File to write.
+            title (str): Title of the algorithm, shown when replaying.
+            values (Sequence[int]): The values the algorithm starts from.
+            chunk_steps (int, optional): Least number of steps between keyframes, seeking replays at most the number
+                used, which is recorded in the header.
+        """
+        self.file = open(path, "wb")
+        self.title = title.encode()
+
+        # Chunks have at least as many steps as there are values, so the 9 bytes a value takes in every keyframe
+        # never outgrow the events (at least 16 bytes a step) of the chunk after it
+        self.chunk_steps = max(1, chunk_steps, len(values))
+        self.num_steps = 0
+        self.index = []
+
+        # Cells the steps are applied to, so each keyframe is the state the replay will have reached
+        self.cells = CellArray(pygame.Surface((1, 1)), array("q", values))
+
+        # Events of the chunk being written, flushed at the end of the chunk
+        self._events = array("q")
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.chunk_steps, len(values), 0, 0, len(self.title)) + self.title)
+
+    def write_step(self, step: Step) -> None:
+        """Adds a step, applying it to the recorded cells.
+
+        Raises:
+            ValueError: If the step has an op that can not be replayed on a CellArray.
+        """
+        if self.num_steps % self.chunk_steps == 0:
+            self._flush_chunk()
+            self._write_keyframe()
+
+        events = self._events
+        for event in step:
+            if event.op not in REPLAYABLE_OPS:
+                raise ValueError(f"{Op(event.op).name} events can not be replayed from a trace")
+            events.extend(event)
+            self.cells.apply(event)
+        if step:
+            events[-4] |= STEP_END
+        else:
+            # A step without events is kept as an empty MARK_RANGE so steps still line up
+            events.extend((Op.MARK_RANGE | STEP_END, 0, -1, 0))
+        self.num_steps += 1
+
+    def _write_keyframe(self) -> None:
+        values, states, counters, _ = self.cells.snapshot()
+        self.index.append([self.file.tell(), 0, 0, 4])
+        self.file.write(values)
+        self.file.write(states)
+        self.file.write(counters)
+
+    def _flush_chunk(self) -> None:
+        events = self._events
+        if not self.index:
+            return
+
+        # The chunk is stored with 4 byte fields whenever they are wide enough
+        entry = self.index[-1]
+        entry[1] = self.file.tell()
+        entry[2] = len(events) // 4
+        if events and (min(events) < _INT32_MIN or max(events) > _INT32_MAX):
+            entry[3] = 8
+            self.file.write(events.tobytes())
+        else:
+            self.file.write(array("i", events).tobytes())
+        del events[:]
+
+    def close(self) -> None:
+        # A run without steps still gets the keyframe of its starting values
+        if not self.index:
+            self._write_keyframe()
+        self._flush_chunk()
+
+        index_offset = self.file.tell()
+        for entry in self.index:
+            self.file.write(INDEX_ENTRY.pack(*entry))
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.chunk_steps, len(self.cells), self.num_steps, index_offset, len(self.title)))
+        self.file.close()
+
+
+def record_trace(path: str, title: str, values: Sequence[int], steps: Iterator[Step], chunk_steps: int = trace_chunk_steps) -> int:
+    """Runs an algorithm's steps to completion, writing them to a trace file. Returns the number of steps."""
+    writer = TraceWriter(path, title, values, chunk_steps)
+    try:
+        for step in steps:
+            writer.write_step(step)
+    finally:
+        writer.close()
+    return writer.num_steps
+
+
+# Memory-mapped trace file, only the header and the chunk index are read when it is opened
+class TraceReader:
+    def __init__(self, path: str) -> None:
+        """
+        Raises:
+            ValueError: If the file is not a trace.
+            OSError: If the file can not be read.
+        """
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.map) < HEADER.size:
+            raise ValueError(f"{path} is not a trace file")
+        magic, version, self.chunk_steps, self.num_values, self.num_steps, index_offset, title_length = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} trace file")
+        self.title = bytes(self.map[HEADER.size:HEADER.size + title_length]).decode()
+
+        count = (len(self.map) - index_offset) // INDEX_ENTRY.size
+        self.index = [INDEX_ENTRY.unpack_from(self.map, index_offset + i * INDEX_ENTRY.size) for i in range(count)]
+
+    def keyframe(self, chunk: int) -> tuple[memoryview, memoryview, memoryview]:
+        """Returns the values, states and counters before the first step of a chunk, in the form CellArray.restore accepts."""
+        offset, n = self.index[chunk][0], self.num_values
+        view = memoryview(self.map)
+        return view[offset:offset + 8 * n], view[offset + 8 * n:offset + 9 * n], view[offset + 9 * n:offset + 9 * n + 32]
+
+    def events(self, chunk: int) -> memoryview:
+        """Returns the events of a chunk as a flat view of (op, a, b, c) fields."""
+        _, offset, count, width = self.index[chunk]
+        return memoryview(self.map)[offset:offset + count * 4 * width].cast("i" if width == 4 else "q")
+
+    def close(self) -> None:
+        self.map.close()
+
+
+# Replays a trace file on a CellArray, without any algorithm code
+# Seeking restores the keyframe of the step's chunk and applies the events up to the step
+class TraceReplay:
+    def __init__(self, screen: pygame.Surface, path: str, x: int, y: int) -> None:
+        """
+        Raises:
+            ValueError: If the file is not a trace.
+            OSError: If the file can not be read.
+        """
+        self.trace = TraceReader(path)
+        self.title = f"{self.trace.title} (replay)"
+        self.x = x
+        self.y = y
+
+        self.cell_array_obj = CellArray(screen, array("q", [0]) * self.trace.num_values)
+        self.solved = False
+        self.solution_index = None
+
+        # Number of steps applied, and the chunk and next event they were applied up to
+        self.position = 0
+        self._chunk = 0
+        self._events = None
+        self._cursor = 0
+        self.seek(0)
+
+    @property
+    def step_count(self) -> int:
+        return self.position
+
+    def get_counts(self) -> dict[str, int]:
+        return self.cell_array_obj.get_counts()
+
+    def is_step_ready(self) -> bool:
+        return True
+
+    def next_step(self) -> None:
+        if self.position >= self.trace.num_steps:
+            self.solved = True
+            return
+        if self.position == (self._chunk + 1) * self.trace.chunk_steps:
+            self._load_chunk(self._chunk + 1)
+
+        events, i, cells = self._events, self._cursor, self.cell_array_obj
+        while True:
+            op = events[i]
+            event = StepEvent(op & ~STEP_END, events[i + 1], events[i + 2], events[i + 3])
+            i += 4
+            if event.op == Op.FOUND:
+                self.solution_index = event.a
+            elif event.op == Op.SOLVED:
+                self.solved = True
+            else:
+                cells.apply(event)
+            if op & STEP_END:
+                break
+        self._cursor = i
+        self.position += 1
+
+    def previous_step(self) -> None:
+        self.seek(self.position - 1)
+
+    def seek(self, step: int) -> None:
+        step = min(max(step, 0), self.trace.num_steps)
+        chunk = min(step // self.trace.chunk_steps, len(self.trace.index) - 1)
+
+        # Stepping forward within the current chunk is cheaper than restoring its keyframe
+        if not (chunk == self._chunk and self._events is not None and self.position <= step):
+            self._load_chunk(chunk)
+            self.cell_array_obj.restore(self.trace.keyframe(chunk))
+            self.position = chunk * self.trace.chunk_steps
+            self.solved = False
+            self.solution_index = None
+        while self.position < step:
+            self.next_step()
+
+    def _load_chunk(self, chunk: int) -> None:
+        self._chunk = chunk
+        self._events = self.trace.events(chunk)
+        self._cursor = 0
+
+    def close(self) -> None:
+        # The view into the file is released before it is unmapped, keyframes are copied into the cells when restored
+        self._events = None
+        self.trace.close()
+
+    def draw(self, screen: pygame.Surface) -> None:
+        draw_text(screen, header, colors.SELECTED_COLOR, self.title, self.x, self.y - 100)
+        self.cell_array_obj.draw(self.x, self.y)
+
+    def draw_dirty(self, screen: pygame.Surface) -> list[pygame.Rect]:
+        return self.cell_array_obj.draw_dirty(self.x, self.y)
+
+
+def trace_steps(algorithm: str, values: Sequence[int], value: Optional[int]) -> tuple[str, Iterator[Step]]:
+    """Returns the title and steps of an algorithm that can be traced, bsa (binary search) or isa (insertion sort)."""
+    if algorithm == "bsa":
+        if not is_sorted(values):
+            raise ValueError("Binary search needs the array to be sorted")
+        return "Binary Search Algorithm", binary_search_steps(values, value)
+    return "Insertion Sort Algorithm", insertion_sort_steps(array("q", values))
+
+
+if __name__ == "__main__":
+    from utils import parse_values
+
+    parser = argparse.ArgumentParser(description="Record algorithm runs to trace files, replay them with main.py --replay")
+    parser.add_argument("algorithm", choices=["bsa", "isa"], help="bsa (binary search) or isa (insertion sort)")
+    parser.add_argument("values", help="comma seperated values or a dataset spec, e.g. \"random:1000:42\"")
+    parser.add_argument("out", help="trace file to write")
+    parser.add_argument("--value", type=int, help="value to find (bsa)")
+    parser.add_argument("--chunk-steps", type=int, default=trace_chunk_steps,
+                        help="least steps between keyframes, at least as many as there are values")
+    args = parser.parse_args()
+    if args.algorithm == "bsa" and args.value is None:
+        parser.error("--value is required for bsa")
+
+    values = parse_values(args.values)
+    if values is None:
+        parser.error(f"invalid values {args.values}")
+    title, steps = trace_steps(args.algorithm, values, args.value)
+    num_steps = record_trace(args.out, title, values, steps, args.chunk_steps)
+    print(f"Recorded {num_steps} steps to {args.out}")
@@ -1,25 +1,47 @@
 import pygame
 
 from cell import CellArray
-from typing import Union, Any
+from datasets import load_values
+from graph import Graph, load_graph
+from typing import Any, Sequence, Union
 from widgets import InputBox
 
 
+def parse_array(user_input: str) -> list[int]:
+    """Parses a comma seperated string of integers, raising ValueError if it is invalid."""
+    # String cleaning
+    user_array = ''.join(user_input.split())
+    user_array = user_array.split(",")
+
+    # Converts each string number into an integer
+    return list(map(lambda x : int(x), user_array))
+
+
+def parse_values(user_input: str) -> Union[Sequence[int], None]:
+    """Returns the values of either a comma seperated array or a dataset spec ("@path" or "kind:n[:seed]", see datasets.load_dataset)."""
+    try:
+        return load_values(user_input)
+    except (ValueError, OverflowError, OSError):
+        print("Invalid input")
+        return None
+
+
 def cell_array_init(screen: pygame.Surface, user_input: str) -> Union[CellArray, None]:
+    """Creates a CellArray from either a comma seperated array or a dataset spec (see parse_values)."""
+    user_array = parse_values(user_input)
+    if user_array is None:
+        return None
+    return CellArray(screen, user_array)
+
+def graph_init(user_input: str) -> Union[Graph, None]:
+    """Creates a Graph from a graph spec ("@path", "grid:WxH[:seed]" or "random:n:m[:seed]", see graph.load_graph)."""
     try:
-        # String cleaning
-        user_array = ''.join(user_input.split())
-        user_array = user_array.split(",")
-        
-        # Converts each string number into an integer
-        user_array = list(map(lambda x : int(x), user_array))
-
-        cell_array = CellArray(screen, user_array)
-        return cell_array
-    except ValueError:
+        return load_graph(user_input)
+    except (ValueError, OverflowError, OSError):
         print("Invalid input")
         return None
 
+
 def get_input_data(input_boxes: list[InputBox]) -> list[Any]:
     def callback():
         results = []
@@ -1,18 +1,75 @@
 import pygame
-import pygame_textinput
 
+from collections import OrderedDict
+from enum import Enum
 from typing import Callable
-from cell import font
-from config import Color, colors, font
+from config import Color, colors, font, text_cache_size
+
+
+# Bounded LRU cache of rendered text surfaces keyed on (font, text, color)
+class TextCache:
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._surfaces = OrderedDict()
+
+        # Counters to check how effective the cache is
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._surfaces)
+
+    def render(self, font: pygame.font.Font, text: str, color: Color) -> pygame.Surface:
+        """Returns the rendered surface of the text, only rasterizing it on a cache miss.
+
+        Args:
+            font (pygame.font.Font): The font to render with.
+            text (str): The text to render.
+            color (Color): The color of the text.
+
+        Returns:
+            pygame.Surface: The rendered text.
+        """
+        key = (font, text, color)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self._surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, True, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_size:
+            # Drop the least recently used surface
+            self._surfaces.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._surfaces), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def clear(self) -> None:
+        self._surfaces.clear()
+        self.hits = self.misses = self.evictions = 0
+
+
+# Shared by every text helper so identical labels are only rendered once
+text_cache = TextCache(text_cache_size)
+
+
+def render_text(font: pygame.font.Font, color: Color, text: str) -> pygame.Surface:
+    return text_cache.render(font, f"{text}", color)
 
 
 def draw_text(screen: pygame.Surface, font: pygame.font.Font, color: Color, text: str, x: int, y: int) -> None:
-    text = font.render(f"{text}", True, color)
+    text = render_text(font, color, text)
     screen.blit(text, (x, y))
 
 
 def draw_centered_text(screen: pygame.Surface, font: pygame.font.Font, color: Color, text: str, x: int, y: int):
-    text: pygame.Surface = font.render(f"{text}", True, color)
+    text: pygame.Surface = render_text(font, color, text)
     text_rect = text.get_rect(center=(x, y))
     screen.blit(text, text_rect)
 
@@ -27,21 +84,36 @@ class InputBox:
         self.height = height
         self.max_length = max_length
 
-        # Base pygame text input module
+        # Base pygame text input module, imported once the first input box is made as it initializes pygame's fonts
+        import pygame_textinput
         self.manager = pygame_textinput.TextInputManager(validator = lambda input : len(input) <= max_length)
         self.textinput = pygame_textinput.TextInputVisualizer(
             manager=self.manager,
             font_color=colors.PRIMARY_COLOR, 
             cursor_color=colors.BACKGROUND_COLOR, 
-            font_object=font,
+            font_object=font.load(),
             cursor_width=0
         )
         self._text_box = pygame.Rect(x, y, width, height)
         self.is_focused = False
+
+        # Set when the box has to be redrawn even though it is not focused
+        self._needs_redraw = True
     
-    def draw(self, events: list[pygame.event.Event]) -> None:
-        # Draw input box label
-        draw_text(self.screen, font, colors.SELECTED_COLOR, f"{self.label}", self.x, self.y - 35)
+    def draw(self, events: list[pygame.event.Event]) -> pygame.Rect:
+        self.draw_label()
+        return self.draw_box(events)
+
+    def draw_label(self, surface: pygame.Surface = None) -> None:
+        # Draw input box label, onto the screen unless another surface (e.g. a static layer) is given
+        draw_text(surface or self.screen, font, colors.SELECTED_COLOR, f"{self.label}", self.x, self.y - 35)
+
+    def static_key(self) -> tuple:
+        # Everything that changes how the label is drawn
+        return self.label, self.x, self.y
+
+    def draw_box(self, events: list[pygame.event.Event]) -> pygame.Rect:
+        """Draws the box and text input without the label, returning the area drawn over."""
 
         # Draw box around text input
         pygame.draw.rect(self.screen, colors.BACKGROUND_COLOR, self._text_box)
@@ -54,6 +126,13 @@ class InputBox:
         _, text_height = self.textinput.surface.get_size()
         padding = (self.height - text_height) // 2
         self.screen.blit(self.textinput.surface, (self.x + padding, self.y + padding))
+
+        self._needs_redraw = False
+        return self._text_box
+
+    def is_dirty(self) -> bool:
+        # A focused box is always redrawn since its text and cursor may change
+        return self.is_focused or self._needs_redraw
     
     def cursor_in_textbox(self, mouse_x: int, mouse_y: int) -> None:
         """ Returns true if the cursor is located inside the text_box rect """
@@ -72,17 +151,25 @@ class InputBox:
             self.textinput.cursor_width = 0
             self.textinput.cursor_color = colors.BACKGROUND_COLOR
             self.is_focused = False
-        self.draw(events)
+        self._needs_redraw = True
 
     def handle_focus(self, events: pygame.event.Event, mouse_x: int, mouse_y: int):
         if (self.cursor_in_textbox(mouse_x, mouse_y)):
             self.toggle_focus(events)
         else:
             self.is_focused = False
+            self._needs_redraw = True
     
     def get_value(self) -> str:
         return self.textinput.value
         
+
+# Enumeration containing all the ways a button could be drawn
+class ButtonState(Enum):
+    IDLE = 1
+    HOVER = 2
+    PRESSED = 3
+
     
 class Button:
     def __init__(self, screen: pygame.Surface, label: str, x: int, y: int, width: int, height: int, on_click: Callable) -> None:
@@ -93,27 +180,60 @@ class Button:
         self.width = width
         self.height = height
         self.on_click = on_click
+
+        # Visual state the button was last drawn in, None if never drawn
+        self._drawn_state = None
     
-    def draw(self) -> None:
-        button_rect = pygame.rect.Rect(self.x, self.y, self.width, self.height)
+    def draw(self, surface: pygame.Surface = None, state: ButtonState = None) -> pygame.Rect:
+        """Draws the button, returning the area drawn over.
 
-        mouse_x, mouse_y = pygame.mouse.get_pos()
-        if self.is_mouse_over(mouse_x, mouse_y):
-            if pygame.mouse.get_pressed()[0]:
-                pygame.draw.rect(self.screen, colors.ACTIVE_COLOR, button_rect)
-            else:
-                pygame.draw.rect(self.screen, colors.HOVER_COLOR, button_rect)
+        Args:
+            surface (pygame.Surface, optional): Surface to draw onto instead of the screen, e.g. a static layer.
+            state (ButtonState, optional): State to draw the button in instead of its current visual state.
+        """
+        surface = surface or self.screen
+        button_rect = self.get_rect()
+
+        if state is None:
+            state = self.get_visual_state()
+        if state == ButtonState.PRESSED:
+            pygame.draw.rect(surface, colors.ACTIVE_COLOR, button_rect)
+        elif state == ButtonState.HOVER:
+            pygame.draw.rect(surface, colors.HOVER_COLOR, button_rect)
         else:
-            pygame.draw.rect(self.screen, colors.BACKGROUND_COLOR, button_rect)
-        pygame.draw.rect(self.screen, colors.PRIMARY_COLOR, button_rect, 5)
+            pygame.draw.rect(surface, colors.BACKGROUND_COLOR, button_rect)
+        pygame.draw.rect(surface, colors.PRIMARY_COLOR, button_rect, 5)
 
-        text = font.render(f"{self.label}", True, colors.SELECTED_COLOR)
         width_padding = self.width / 2
         height_padding = self.height / 2
-        text_x = self.x + width_padding
-        text_y = self.y + height_padding
-        text_rect = text.get_rect(center=(text_x, text_y))
-        self.screen.blit(text, text_rect)
+        draw_centered_text(surface, font, colors.SELECTED_COLOR, self.label, self.x + width_padding, self.y + height_padding)
+
+        if surface is self.screen:
+            self._drawn_state = state
+        return button_rect
+
+    def get_rect(self) -> pygame.Rect:
+        return pygame.Rect(self.x, self.y, self.width, self.height)
+
+    def static_key(self) -> tuple:
+        # Everything that changes how the idle button is drawn
+        return self.label, self.x, self.y, self.width, self.height
+
+    def mark_drawn(self, state: ButtonState) -> None:
+        # Records that the button is on screen in a state, when it was put there by something else (e.g. a static layer)
+        self._drawn_state = state
+
+    def get_visual_state(self) -> "ButtonState":
+        mouse_x, mouse_y = pygame.mouse.get_pos()
+        if self.is_mouse_over(mouse_x, mouse_y):
+            if pygame.mouse.get_pressed()[0]:
+                return ButtonState.PRESSED
+            return ButtonState.HOVER
+        return ButtonState.IDLE
+
+    def is_dirty(self) -> bool:
+        # Buttons only change when the mouse moves on/off them or presses them
+        return self._drawn_state != self.get_visual_state()
     
     def is_mouse_over(self, mouse_x: int, mouse_y: int) -> bool:
         if (mouse_x >= self.x and mouse_y >= self.y and
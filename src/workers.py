@@ -0,0 +1,169 @@
+import multiprocessing
+import multiprocessing.queues
+import queue
+import threading
+from array import array
+from collections import deque
+from time import perf_counter
+from typing import Any, Callable, Iterator
+
+from config import step_worker_batch_size, step_worker_flush_ms, step_worker_max_batches
+from steps import Step
+
+
+# Ways the steps of an algorithm can be computed
+# "inline" runs the generator on the render thread as it is stepped, "thread" and "process" run it ahead in a worker
+MODES = ("inline", "thread", "process")
+
+# Mode used by start_steps, set from the command line
+mode = "inline"
+
+
+def set_mode(new_mode: str) -> None:
+    global mode
+    if new_mode not in MODES:
+        raise ValueError(f"Unknown step worker mode {new_mode}, expected one of {', '.join(MODES)}")
+    mode = new_mode
+
+
+# Sent by a worker after its last step, or with the exception that stopped it
+class _End:
+    def __init__(self, error: BaseException = None) -> None:
+        self.error = error
+
+
+def _put(steps_queue, item: Any, cancelled) -> bool:
+    # Blocks while the queue is full (the render loop has not caught up), giving up if the worker is cancelled
+    while not cancelled.is_set():
+        try:
+            steps_queue.put(item, timeout=0.05)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _produce(factory: Callable[..., Iterator[Step]], args: tuple, steps_queue, cancelled, batch_size: int, flush_time: float) -> None:
+    # Runs in the worker, sending steps in batches so the queue is not locked (or pickled through) once per step
+    # A batch is sent early when its steps are slow to compute so the render loop is not kept waiting for a full one
+    steps = factory(*args)
+    batch = []
+    batch_start = perf_counter()
+    try:
+        for step in steps:
+            batch.append(step)
+            if len(batch) >= batch_size or perf_counter() - batch_start > flush_time:
+                if not _put(steps_queue, batch, cancelled):
+                    return
+                batch = []
+                batch_start = perf_counter()
+        if batch and not _put(steps_queue, batch, cancelled):
+            return
+        _put(steps_queue, _End(), cancelled)
+    except Exception as error:
+        _put(steps_queue, _End(error), cancelled)
+    finally:
+        steps.close()
+        # A cancelled process exits without waiting to flush batches that will never be read
+        if cancelled.is_set() and isinstance(steps_queue, multiprocessing.queues.Queue):
+            steps_queue.cancel_join_thread()
+
+
+# Iterator over the steps of an algorithm computed ahead in a worker thread or process
+# The worker sends batches of steps through a bounded queue, so at most max_batches * batch_size steps are ever waiting,
+# and blocks when it is full until the render loop has taken some
+class StepWorker:
+    def __init__(self, factory: Callable[..., Iterator[Step]], args: tuple, use_process: bool = False,
+                 max_batches: int = step_worker_max_batches, batch_size: int = step_worker_batch_size,
+                 flush_time: float = step_worker_flush_ms / 1000) -> None:
+        """
+        Args:
+            factory (Callable[..., Iterator[Step]]): The step generator function (see steps.py), called in the worker.
+            args (tuple): Arguments of the generator function, they are copied into the worker when it is a process.
+            use_process (bool, optional): Runs the worker in a process instead of a thread, for CPU heavy algorithms.
+            max_batches (int, optional): Number of batches the queue holds.
+            batch_size (int, optional): Most steps sent in one batch.
+            flush_time (float, optional): Longest time (in seconds) a worker spends filling one batch.
+        """
+        if use_process:
+            context = multiprocessing.get_context()
+            self._queue = context.Queue(max_batches)
+            self._cancelled = context.Event()
+            # Memoryviews (e.g. of memory-mapped datasets) can not be sent to another process
+            args = tuple(array(arg.format, arg) if isinstance(arg, memoryview) else arg for arg in args)
+            self._worker = context.Process(target=_produce, daemon=True,
+                                           args=(factory, args, self._queue, self._cancelled, batch_size, flush_time))
+        else:
+            self._queue = queue.Queue(max_batches)
+            self._cancelled = threading.Event()
+            self._worker = threading.Thread(target=_produce, daemon=True,
+                                            args=(factory, args, self._queue, self._cancelled, batch_size, flush_time))
+
+        # Steps received but not yet taken, and whether the worker has sent its last step
+        self._steps = deque()
+        self.finished = False
+        self._error = None
+        self._worker.start()
+
+    def __iter__(self) -> "StepWorker":
+        return self
+
+    def __next__(self) -> Step:
+        # Only blocks if the worker has not computed the next step yet, check ready first to avoid waiting
+        while not self._steps:
+            if self.finished:
+                if self._error is not None:
+                    error, self._error = self._error, None
+                    raise error
+                raise StopIteration
+            self._receive(self._queue.get())
+        return self._steps.popleft()
+
+    def ready(self) -> bool:
+        """Returns True if the next step (or the end of the steps) can be taken without waiting for the worker."""
+        if self._steps or self.finished:
+            return True
+        try:
+            self._receive(self._queue.get_nowait())
+        except queue.Empty:
+            return False
+        return True
+
+    def _receive(self, item: Any) -> None:
+        if isinstance(item, _End):
+            self.finished = True
+            self._error = item.error
+        else:
+            self._steps.extend(item)
+
+    def close(self, timeout: float = 1) -> None:
+        """Stops the worker and waits for it to exit, dropping the steps it computed.
+
+        Args:
+            timeout (float, optional): Longest time (in seconds) to wait, a process still running after it is killed.
+        """
+        self._cancelled.set()
+        self._steps.clear()
+        self.finished = True
+
+        # Emptying the queue lets a worker blocked on it notice it was cancelled straight away
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        self._worker.join(timeout=timeout)
+        if isinstance(self._worker, multiprocessing.process.BaseProcess):
+            # SIGTERM is not enough, a process forked after pygame started inherits its handler that turns it into a QUIT event
+            if self._worker.is_alive():
+                self._worker.kill()
+                self._worker.join()
+            self._queue.close()
+            self._queue.cancel_join_thread()
+
+
+def start_steps(factory: Callable[..., Iterator[Step]], *args: Any) -> Iterator[Step]:
+    """Returns the steps of factory(*args), computed by a worker unless the mode is "inline"."""
+    if mode == "inline":
+        return factory(*args)
+    return StepWorker(factory, args, use_process=mode == "process")